@@ -0,0 +1,78 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Shared benchmark helpers
+
+import gc
+import time
+from machine import SPI, Pin
+
+from magsensor.mcp2515 import MCP2515
+
+
+# Chip select wrapper counting SPI transactions
+class CountingPin:
+    def __init__(self, pin):
+        self.pin = pin
+        self.count = 0
+
+    def value(self, val=None):
+        if val is None:
+            return self.pin.value()
+
+        if not val:
+            self.count += 1
+        self.pin.value(val)
+
+    def deinit(self):
+        pass
+
+
+# Create a loopback mode driver with a counting chip select
+def make_can(**kwargs):
+    spi = SPI(0, sck=Pin(2), mosi=Pin(3), miso=Pin(4))
+    cs = CountingPin(Pin(9, Pin.OUT, value=1))
+
+    can = MCP2515(spi, cs, loopback=True, silent=True, **kwargs)
+    return can, cs
+
+
+# Run func n times, return (SPI transactions, heap bytes, us) per call
+def measure(func, cs, n):
+    gc.collect()
+    gc.disable()
+    cs.count = 0
+    mem = gc.mem_alloc()
+    start = time.ticks_us()
+
+    for _ in range(n):
+        func()
+
+    elapsed = time.ticks_diff(time.ticks_us(), start)
+    alloc = gc.mem_alloc() - mem
+    transactions = cs.count
+    gc.enable()
+
+    return transactions / n, alloc / n, elapsed / n
+
+
+def report(name, result):
+    print(
+        "{:<14} {:>6.1f} SPI {:>7.1f} bytes {:>7.1f} us".format(
+            name, result[0], result[1], result[2]
+        )
+    )
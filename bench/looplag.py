@@ -0,0 +1,112 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# Event loop lag and strike jitter of the receiver for different
+# controller polling periods. The receiver's tasks run on dings looped
+# back by the controller, alongside a task sleeping 5 ms at a time and
+# measuring how late it wakes. Jitter is the spread of the time from
+# sending a ding to its strike, which the receiver delay makes constant
+# when nothing else interferes. With INT_PIN set interrupt driven
+# receive is measured too.
+#
+#   mpremote mount . run bench/looplag.py
+#   python -m host.run --int-pin 20 bench/looplag.py
+
+import asyncio
+import time
+from machine import Pin
+
+from magsensor import receive
+from magsensor.mcp2515.canio import Message
+from magsensor.primitives import RingbufQueue
+from magsensor.strikes import StrikeScheduler
+
+from bench.common import make_can
+
+N_DINGS = 60
+DING_MS = 50
+DELAY_MS = 20
+PROBE_MS = 5
+
+# MCP2515 INT pin, None if not connected. Set to 20 on the host
+INT_PIN = None
+
+
+async def probe(lags):
+    while True:
+        start = time.ticks_us()
+        await asyncio.sleep_ms(PROBE_MS)
+        lags.append(time.ticks_diff(time.ticks_us(), start) - 1000 * PROBE_MS)
+
+
+async def run(poll_ms, int_pin=None):
+    can, _ = make_can(
+        fast_send=True, int_pin=int_pin, poll_ms=poll_ms, rx_queue_size=receive.RX_BATCH
+    )
+    delays = [DELAY_MS] * 2
+    receive.load_bell_filters(can, len(delays))
+
+    sent_us = [0] * N_DINGS
+    spans = []
+
+    def strike(bell, strike_ticks_ms):
+        spans.append(time.ticks_diff(time.ticks_us(), sent_us[len(spans)]))
+
+    strikes = StrikeScheduler(receive.STRIKE_SLOTS, strike)
+    log_q = RingbufQueue(12)
+    lags = []
+    tasks = [
+        asyncio.create_task(coro)
+        for coro in (
+            receive.can_receive(can, delays, strikes, log_q),
+            strikes.run(),
+            receive.logger(log_q),
+            probe(lags),
+        )
+    ]
+
+    ding = Message(1, b"\x00\x00")
+    for idx in range(N_DINGS):
+        sent_us[idx] = time.ticks_us()
+        can.send(ding)
+        await asyncio.sleep_ms(DING_MS)
+
+    for task in tasks:
+        task.cancel()
+
+    name = "poll {} ms".format(poll_ms) if int_pin is None else "INT pin"
+    if not lags or not spans:
+        # No strikes means no frames were read, an INT pin not connected for one
+        print("{:<10} no samples, strikes {}".format(name, len(spans)))
+        return
+
+    lags.sort()
+    print(
+        "{:<10} lag us: median {:>5} max {:>5}  jitter us: {:>5}  strikes {}".format(
+            name,
+            lags[len(lags) // 2],
+            lags[-1],
+            max(spans) - min(spans),
+            len(spans),
+        )
+    )
+
+
+for poll_ms in (0, 1, 5):
+    asyncio.run(run(poll_ms))
+
+if INT_PIN is not None:
+    asyncio.run(run(0, Pin(INT_PIN, Pin.IN, Pin.PULL_UP)))
@@ -0,0 +1,89 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Compare the cost of making a message with the constructor, as
+# read_message() does for each frame, against reusing one, as the sensor
+# and read_message_into() do. Needs no hardware, so also runs on the host.
+#
+#   mpremote mount . run bench/message.py
+#   python -m host.run bench/message.py
+
+import gc
+import struct
+import time
+
+from magsensor.mcp2515.canio import Message
+
+N_MESSAGES = 1000
+
+try:
+    mem_alloc = gc.mem_alloc
+except AttributeError:
+    # CPython
+    import tracemalloc
+
+    tracemalloc.start()
+
+    def mem_alloc():
+        return tracemalloc.get_traced_memory()[0]
+
+
+# CPython timing is taken from the host's clock, the host environment's
+# virtual clock only counts time spent on SPI and the bus
+try:
+    perf_counter_ns = time.perf_counter_ns
+
+    def ticks_us():
+        return perf_counter_ns() // 1000
+
+    def ticks_diff(a, b):
+        return a - b
+
+except AttributeError:
+    # MicroPython
+    ticks_us, ticks_diff = time.ticks_us, time.ticks_diff
+
+
+# Run func n times, return (heap bytes, us) per call. Heap bytes is the
+# growth with the collector disabled, so includes short lived objects
+# under MicroPython but only retained ones under CPython
+def measure(func, n):
+    gc.collect()
+    gc.disable()
+    mem = mem_alloc()
+    start = ticks_us()
+
+    for _ in range(n):
+        func()
+
+    elapsed = ticks_diff(ticks_us(), start)
+    alloc = mem_alloc() - mem
+    gc.enable()
+
+    return alloc / n, elapsed / n
+
+
+def report(name, result):
+    print("{:<10} {:>7.1f} bytes {:>7.2f} us".format(name, result[0], result[1]))
+
+
+# A received frame's data, as held in the driver's queue
+data = bytearray(b"\x12\x34")
+msg = Message(1, bytearray(2))
+
+report("new", measure(lambda: Message(1, data), N_MESSAGES))
+report("reused", measure(lambda: struct.pack_into("<H", msg.data, 0, 0x3412), N_MESSAGES))
@@ -0,0 +1,74 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# SPI profile of the driver for a sensor and a receiver workload. The
+# sensor sends dings with a deadline while health is monitored, the
+# receiver takes rounds of dings looped back by the controller in
+# batches. Nothing is put on the bus.
+#
+#   mpremote mount . run bench/profile.py
+
+import asyncio
+
+from magsensor import receive, sensor
+from magsensor.mcp2515.canio import Message
+
+from bench.common import make_can
+
+N_DINGS = 100
+N_ROUNDS = 20
+NBELLS = 12
+
+
+async def sensor_load():
+    can, _ = make_can(fast_send=True)
+    ding_msg = Message(1, b"\x00\x00", priority=sensor.DING_PRIORITY)
+    can.profile()
+    health = asyncio.create_task(can.monitor_health(sensor.HEALTH_PERIOD_MS))
+
+    for _ in range(N_DINGS):
+        await can.send_async(ding_msg, deadline_ms=sensor.DING_DEADLINE_MS)
+        can.read_messages_into([ding_msg])
+        await asyncio.sleep_ms(10)
+
+    health.cancel()
+    print("Sensor, {} dings".format(N_DINGS))
+    can.profile(False).report()
+
+
+async def receiver_load():
+    can, _ = make_can(fast_send=True, rx_queue_size=receive.RX_BATCH)
+    listener = can.listen()
+    rx_msgs = [Message(0, b"") for _ in range(receive.RX_BATCH)]
+    can.profile()
+    health = asyncio.create_task(can.monitor_health(receive.HEALTH_PERIOD_MS))
+
+    for _ in range(N_ROUNDS):
+        for bell in range(1, NBELLS + 1):
+            await can.send_async(Message(bell, b"\x00\x00"))
+            await asyncio.sleep_ms(1)
+        while listener.drain_into(rx_msgs):
+            pass
+        await asyncio.sleep_ms(100)
+
+    health.cancel()
+    print("Receiver, {} rounds on {} bells".format(N_ROUNDS, NBELLS))
+    can.profile(False).report()
+
+
+asyncio.run(sensor_load())
+print()
+asyncio.run(receiver_load())
@@ -0,0 +1,51 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Compare SPI transactions, heap allocation and time per received frame
+# for Listener.receive() and Listener.receive_into(). Frames are looped
+# back by the controller so nothing is put on the bus.
+#
+#   mpremote mount . run bench/receive.py
+
+from magsensor.mcp2515.canio import Message
+
+from bench.common import make_can, measure, report
+
+N_FRAMES = 200
+
+tx_msg = Message(id=1, data=b"\x12\x34")
+rx_msg = Message(id=0, data=b"")
+
+can, cs = make_can(fast_send=True)
+listener = can.listen()
+
+
+def loop_receive():
+    can.send(tx_msg)
+    listener.receive()
+
+
+def loop_receive_into():
+    can.send(tx_msg)
+    listener.receive_into(rx_msg)
+
+
+# Prime the message buffers
+loop_receive_into()
+
+report("receive", measure(loop_receive, cs, N_FRAMES))
+report("receive_into", measure(loop_receive_into, cs, N_FRAMES))
@@ -0,0 +1,35 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Compare SPI transactions, heap allocation and time per MCP2515.send()
+# for the standard and fast send paths. Runs the controller in loopback
+# mode so nothing is put on the bus.
+#
+#   mpremote mount . run bench/send.py
+
+from magsensor.mcp2515.canio import Message
+
+from bench.common import make_can, measure, report
+
+N_SENDS = 200
+
+msg = Message(id=1, data=b"\x12\x34")
+
+for fast_send in (False, True):
+    can, cs = make_can(fast_send=fast_send)
+    result = measure(lambda: can.send(msg), cs, N_SENDS)
+    report("send fast" if fast_send else "send", result)
@@ -0,0 +1,43 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Report SPI transactions and wall time for MCP2515 construction, i.e.
+# controller reset and configuration, and for loading the sensor filters.
+#
+#   mpremote mount . run bench/startup.py
+
+import time
+from machine import SPI, Pin
+
+from magsensor.mcp2515 import MCP2515
+from magsensor import sensor
+
+from bench.common import CountingPin
+
+spi = SPI(0, sck=Pin(2), mosi=Pin(3), miso=Pin(4))
+cs = CountingPin(Pin(9, Pin.OUT, value=1))
+
+start = time.ticks_us()
+can = MCP2515(spi, cs)
+elapsed = time.ticks_diff(time.ticks_us(), start)
+print("MCP2515()      {:>4} SPI {:>7} us".format(cs.count, elapsed))
+
+cs.count = 0
+start = time.ticks_us()
+can.load_filters(sensor.MASKS, sensor.FILTERS)
+elapsed = time.ticks_diff(time.ticks_us(), start)
+print("load_filters() {:>4} SPI {:>7} us".format(cs.count, elapsed))
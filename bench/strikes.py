@@ -0,0 +1,114 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+# Scheduling error of strikes emitted by a task per strike, as the
+# receiver used to, and by StrikeScheduler. Rounds of twelve strikes are
+# scheduled 100 ms ahead, two bells in each round sharing a strike time.
+# Reports how many ms after its strike time each strike came out, strikes
+# out of order and heap per strike. Needs no CAN hardware. Host heap
+# figures include the virtual clock's timer events.
+#
+#   mpremote mount . run bench/strikes.py
+#   python -m host.run bench/strikes.py
+
+import asyncio
+import gc
+import time
+
+from magsensor.strikes import StrikeScheduler
+
+N_ROUNDS = 10
+NBELLS = 12
+LEAD_MS = 100
+GAP_MS = 8
+ROUND_MS = 200
+
+
+def strike_times(now):
+    # Bells 6 and 7 strike together
+    return [
+        time.ticks_add(now, LEAD_MS + GAP_MS * (bell - (bell > 6)))
+        for bell in range(1, NBELLS + 1)
+    ]
+
+
+# Preallocated so recording doesn't show in the heap figures
+class Record:
+    def __init__(self):
+        self.errors = [0] * (N_ROUNDS * NBELLS)
+        self.order = bytearray(N_ROUNDS * NBELLS)
+        self.n = 0
+
+    def strike(self, bell, strike_ticks_ms):
+        if self.n < len(self.order):
+            self.errors[self.n] = time.ticks_diff(time.ticks_ms(), strike_ticks_ms)
+            self.order[self.n] = bell
+            self.n += 1
+
+
+def out_of_order(order):
+    # Each round's strikes should come out as bells 1..NBELLS
+    expected = list(range(1, NBELLS + 1)) * N_ROUNDS
+    return sum(1 for a, b in zip(order, expected) if a != b)
+
+
+async def per_task(record):
+    async def delay(bell, strike_ticks_ms):
+        await asyncio.sleep_ms(time.ticks_diff(strike_ticks_ms, time.ticks_ms()))
+        record.strike(bell, strike_ticks_ms)
+
+    for _ in range(N_ROUNDS):
+        # Add in reverse to show the order a tie comes out in
+        times = strike_times(time.ticks_ms())
+        for bell in range(NBELLS, 0, -1):
+            asyncio.create_task(delay(bell, times[bell - 1]))
+        await asyncio.sleep_ms(ROUND_MS)
+
+
+async def scheduler(record):
+    strikes = StrikeScheduler(2 * NBELLS, record.strike)
+    task = asyncio.create_task(strikes.run())
+
+    for _ in range(N_ROUNDS):
+        times = strike_times(time.ticks_ms())
+        for bell in range(1, NBELLS + 1):
+            strikes.add(bell, times[bell - 1])
+        await asyncio.sleep_ms(ROUND_MS)
+
+    task.cancel()
+
+
+def measure(name, func):
+    record = Record()
+    gc.collect()
+    gc.disable()
+    mem = gc.mem_alloc()
+    asyncio.run(func(record))
+    alloc = gc.mem_alloc() - mem
+    gc.enable()
+
+    n = record.n
+    errors = sorted(record.errors[:n])
+    print(
+        "{:<10} {:>3} strikes, error ms: mean {:>5.2f} max {:>3}, {:>2} out of order, "
+        "{:>6.1f} bytes/strike".format(
+            name, n, sum(errors) / n, errors[-1], out_of_order(record.order), alloc / n
+        )
+    )
+
+
+measure("per task", per_task)
+measure("scheduler", scheduler)
@@ -0,0 +1,88 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Host environment for running the MicroPython code under CPython
+#
+# install() must be called before importing anything from magsensor.
+
+import asyncio
+import builtins
+import gc
+import sys
+import time
+import tracemalloc
+import warnings
+
+from . import aio, machine, micropython
+from .board import Board, current_board, default_board
+from .clock import clock, ticks_add, ticks_diff
+
+
+def _mem_alloc():
+    # Bytes held by Python objects, traced from the first call
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return tracemalloc.get_traced_memory()[0]
+
+
+_import = builtins.__import__
+
+
+def _import_relative(name, globals=None, locals=None, fromlist=(), level=0):
+    # MicroPython lazy loaders call __import__(name, None, None, True, 1), CPython needs the
+    # caller's globals to resolve a relative import
+    if globals is None and level:
+        globals = sys._getframe(1).f_globals
+    return _import(name, globals, locals, fromlist, level)
+
+
+def install(start_us=0, quantum_us=aio.DEFAULT_QUANTUM_US, until_ms=None):
+    """Provide the machine and micropython modules and the MicroPython parts of time, asyncio
+    and gc, all running on the virtual clock.
+
+    :param int start_us: Initial virtual time, for testing tick wraparound
+    :param int quantum_us: Virtual time charged per event loop pass
+    :param int until_ms: If set, asyncio.run() stops after this much virtual time
+    """
+    clock.reset(start_us)
+
+    sys.modules["machine"] = machine
+    sys.modules["micropython"] = micropython
+
+    time.ticks_ms = clock.ticks_ms
+    time.ticks_us = clock.ticks_us
+    time.ticks_cpu = clock.ticks_cpu
+    time.ticks_add = ticks_add
+    time.ticks_diff = ticks_diff
+    time.sleep_ms = clock.sleep_ms
+    time.sleep_us = clock.sleep_us
+
+    asyncio.sleep_ms = aio.sleep_ms
+    asyncio.wait_for_ms = aio.wait_for_ms
+    asyncio.ThreadSafeFlag = aio.ThreadSafeFlag
+    asyncio.StreamWriter = aio.StreamWriter
+    asyncio.run = aio.run
+    aio.run_options["quantum_us"] = quantum_us
+    aio.run_options["until_ms"] = until_ms
+
+    gc.mem_alloc = _mem_alloc
+    gc.mem_free = lambda: 0
+
+    builtins.__import__ = _import_relative
+
+    # magsensor.primitives makes a coroutine only to get its type
+    warnings.filterwarnings("ignore", "coroutine '_g' was never awaited", RuntimeWarning)
@@ -0,0 +1,160 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# asyncio on the virtual clock
+#
+# The event loop's selector never blocks. Instead it advances the virtual
+# clock to the next timer, or by a minimum quantum when tasks are ready,
+# standing in for the time the scheduler and task code take on the
+# board. Without the quantum a task polling with sleep_ms(0) would never
+# see time pass.
+#
+# The MicroPython only parts of asyncio used by the application are
+# provided by install().
+
+import asyncio
+import selectors
+
+from .clock import clock
+
+# Time charged per scheduler pass
+DEFAULT_QUANTUM_US = 20
+
+
+class _VirtualSelector(selectors.BaseSelector):
+    def __init__(self, quantum_us):
+        self._quantum_ns = quantum_us * 1000
+        self._map = {}
+
+    def register(self, fileobj, events, data=None):
+        key = selectors.SelectorKey(fileobj, id(fileobj), events, data)
+        self._map[fileobj] = key
+        return key
+
+    def unregister(self, fileobj):
+        return self._map.pop(fileobj)
+
+    def select(self, timeout=None):
+        if timeout is None:
+            # Nothing ready or timed, only a clock event can wake a task
+            next_ns = clock.next_event()
+            if next_ns is None:
+                raise RuntimeError("All tasks are waiting with nothing scheduled")
+            clock.advance_to(next_ns, stop_on_event=True)
+        else:
+            delta_ns = max(int(timeout * 1e9), self._quantum_ns)
+            clock.advance(delta_ns, stop_on_event=True)
+        return []
+
+    def get_map(self):
+        return self._map
+
+    def close(self):
+        self._map.clear()
+
+
+class VirtualTimeLoop(asyncio.SelectorEventLoop):
+    """Event loop on the virtual clock"""
+
+    def __init__(self, quantum_us=DEFAULT_QUANTUM_US):
+        super().__init__(_VirtualSelector(quantum_us))
+
+    def time(self):
+        return clock.now_ns / 1e9
+
+
+# Settings used by the patched asyncio.run()
+run_options = {"quantum_us": DEFAULT_QUANTUM_US, "until_ms": None}
+
+
+def run(main):
+    """asyncio.run() on a virtual time loop. If run_options["until_ms"] is set, main is
+    cancelled after that much virtual time"""
+    until_ms = run_options["until_ms"]
+    if until_ms is not None:
+        main = _run_for(main, until_ms)
+
+    with asyncio.Runner(loop_factory=lambda: VirtualTimeLoop(run_options["quantum_us"])) as runner:
+        return runner.run(main)
+
+
+async def _run_for(main, until_ms):
+    try:
+        return await asyncio.wait_for(main, until_ms / 1000)
+    except asyncio.TimeoutError:
+        return None
+
+
+async def sleep_ms(ms):
+    await asyncio.sleep(ms / 1000)
+
+
+async def wait_for_ms(aw, timeout):
+    return await asyncio.wait_for(aw, timeout / 1000)
+
+
+class ThreadSafeFlag:
+    """asyncio.ThreadSafeFlag, set() may be called from a pin IRQ"""
+
+    def __init__(self):
+        self._flag = False
+        self._waiter = None
+
+    def set(self):
+        self._flag = True
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    def clear(self):
+        self._flag = False
+
+    async def wait(self):
+        if not self._flag:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        self._flag = False
+
+
+class StreamWriter:
+    """MicroPython asyncio.StreamWriter for a UART"""
+
+    def __init__(self, stream, extra=None):
+        self.s = stream
+        self.out_buf = bytearray()
+
+    def write(self, buf):
+        if isinstance(buf, str):
+            buf = buf.encode()
+        self.out_buf += buf
+
+    async def drain(self):
+        # Wait for the bytes to leave at the UART baud rate, ten bits each
+        buf, self.out_buf = self.out_buf, bytearray()
+        self.s.write(buf)
+        baudrate = getattr(self.s, "baudrate", None)
+        if buf and baudrate:
+            await asyncio.sleep(len(buf) * 10 / baudrate)
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
@@ -0,0 +1,134 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Emulated boards
+#
+# A Board holds the pins, SPI buses and UARTs behind the host machine
+# module. Each simulated node runs its tasks with its own board current,
+# so the same application code can run as several nodes at once.
+
+import contextvars
+
+from .clock import clock
+from .mcp2515 import MCP2515Emulator, Pin
+
+_current = contextvars.ContextVar("board")
+
+# SPI clock used when machine.SPI() isn't given a baudrate, as the RP2040 port
+DEFAULT_SPI_BAUDRATE = 1000000
+
+
+class UART:
+    """Emulated UART, output is collected in `output`"""
+
+    def __init__(self, baudrate=115200):
+        self.baudrate = baudrate
+        self.output = bytearray()
+        self.input = bytearray()
+
+    def write(self, buf):
+        self.output += buf
+        return len(buf)
+
+    def any(self):
+        return len(self.input)
+
+    def read(self, nbytes=-1):
+        if not self.input:
+            return None
+        if nbytes < 0:
+            nbytes = len(self.input)
+
+        data = bytes(self.input[:nbytes])
+        del self.input[:nbytes]
+        return data
+
+    def readinto(self, buf, nbytes=-1):
+        data = self.read(len(buf) if nbytes < 0 else nbytes)
+        if data is None:
+            return None
+
+        buf[: len(data)] = data
+        return len(data)
+
+
+class Board:
+    """The hardware of one node
+
+    :param bytes unique_id: Value returned by machine.unique_id()
+    """
+
+    def __init__(self, unique_id=b"\x00" * 8):
+        self.unique_id = unique_id
+        self.pins = {}
+        self.spi_buses = {}
+        self.uarts = {}
+
+    def pin(self, pin_id):
+        """The pin with a given number, created on first use"""
+        pin = self.pins.get(pin_id)
+        if pin is None:
+            pin = self.pins[pin_id] = Pin()
+        return pin
+
+    def uart(self, uart_id):
+        uart = self.uarts.get(uart_id)
+        if uart is None:
+            uart = self.uarts[uart_id] = UART()
+        return uart
+
+    def add_mcp2515(self, spi_id=0, cs_pin=9, int_pin=None, **kwargs):
+        """Wire an emulated MCP2515 to an SPI bus, chip select and optional INT pin. Keyword
+        arguments are passed to `MCP2515Emulator`. Returns the emulator"""
+        chip = MCP2515Emulator(**kwargs)
+        self.spi_buses.setdefault(spi_id, []).append(chip)
+        self.pins[cs_pin] = chip.cs
+        if int_pin is not None:
+            self.pins[int_pin] = chip.int_pin
+        return chip
+
+    def script(self, pin_id, waveform):
+        """Drive a pin from a list of (delay_us, level) pairs, each delay counted from the
+        previous change. Changes run on the virtual clock and fire pin IRQs"""
+        pin = self.pin(pin_id)
+        time_ns = clock.now_ns
+        for delay_us, level in waveform:
+            time_ns += int(delay_us * 1000)
+            clock.call_at(time_ns, pin.drive, level)
+
+    def run(self, coro):
+        """Create a task running coro with this board current"""
+        import asyncio
+
+        context = contextvars.copy_context()
+        context.run(_current.set, self)
+        return asyncio.get_running_loop().create_task(coro, context=context)
+
+    def __enter__(self):
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, *args):
+        _current.reset(self._token)
+
+
+# Board used outside any node
+default_board = Board()
+
+
+def current_board():
+    return _current.get(default_board)
@@ -0,0 +1,244 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Simulated CAN bus connecting emulated MCP2515s
+#
+# When the bus is idle and a node has a frame pending, every node with a
+# pending frame enters arbitration. The lowest arbitration field wins and
+# the others see lost arbitration and retry. The winner holds the bus for
+# the bit-stuffed length of its frame plus interframe space, then every
+# other node receives it. A frame no other node acknowledges, or one hit
+# by an injected bus error, fails with a transmit error and is retried,
+# with the error counters kept as the CAN specification describes.
+#
+# A node whose CNF1-3 give a bit rate more than 1% from the bus's takes
+# no part: it neither receives nor acknowledges, and anything it sends is
+# destroyed by errors.
+
+import random
+from collections import namedtuple
+
+from .clock import clock
+from .mcp2515 import MODE_LISTENONLY, MODE_NORMAL, TEC, REC
+
+# Bits after CRC: delimiter, ACK slot, ACK delimiter, 7 EOF, 3 interframe space
+_TRAILER_BITS = 13
+
+# Bits of an error frame, flag and delimiter, and interframe space
+_ERROR_FRAME_BITS = 6 + 8 + 3
+
+Transfer = namedtuple("Transfer", ["start_ns", "end_ns", "frame", "sender", "requested_ns", "ok"])
+Transfer.__doc__ = """One frame on the bus. `requested_ns` is when the sender's buffer was
+requested, `ok` is False for a frame destroyed by an error"""
+
+
+def _bits(value, width):
+    return [(value >> n) & 1 for n in range(width - 1, -1, -1)]
+
+
+def arbitration_bits(frame):
+    """Identifier, RTR and IDE bits in bus order. The lowest sequence wins arbitration"""
+    rtr = 1 if frame.rtr else 0
+    if frame.extended:
+        return _bits(frame.id >> 18, 11) + [1, 1] + _bits(frame.id & 0x3FFFF, 18) + [rtr]
+
+    return _bits(frame.id, 11) + [rtr, 0]
+
+
+def _crc15(bits):
+    crc = 0
+    for bit in bits:
+        crc_next = bit ^ ((crc >> 14) & 1)
+        crc = (crc << 1) & 0x7FFF
+        if crc_next:
+            crc ^= 0x4599
+    return crc
+
+
+def frame_bits(frame):
+    """Length of a frame on the wire in bits, including stuff bits and interframe space"""
+    dlc = len(frame.data)
+    data = b"" if frame.rtr else frame.data
+
+    # SOF, arbitration, reserved bits, DLC, data
+    bits = [0] + arbitration_bits(frame) + ([0, 0] if frame.extended else [0])
+    bits += _bits(dlc, 4)
+    for byte in data:
+        bits += _bits(byte, 8)
+    bits += _bits(_crc15(bits), 15)
+
+    # A stuff bit follows five equal bits, and counts towards the next run
+    stuffed = 0
+    run_bit, run = None, 0
+    for bit in bits:
+        if bit == run_bit:
+            run += 1
+        else:
+            run_bit, run = bit, 1
+
+        if run == 5:
+            stuffed += 1
+            run_bit, run = 1 - bit, 1
+
+    return len(bits) + stuffed + _TRAILER_BITS
+
+
+class CANBus:
+    """A CAN bus shared by emulated MCP2515s
+
+    :param int baudrate: Bit rate, nodes configured for another are out of step. Defaults
+        to 250000 as MCP2515.
+    :param float error_rate: Probability of a bus error destroying each frame
+    :param int seed: Seed for error injection
+    """
+
+    def __init__(self, baudrate=250000, error_rate=0.0, seed=0):
+        self.baudrate = baudrate
+        self.error_rate = error_rate
+        self.nodes = []
+        self.log = []
+
+        self._random = random.Random(seed)
+        self._bit_ns = 1000000000 // baudrate
+        self._busy = False
+        self._start_ns = clock.now_ns
+
+    def attach(self, chip):
+        """Connect an emulator to the bus"""
+        chip.auto_transmit = False
+        chip.on_request = self._request
+        self.nodes.append(chip)
+
+    @property
+    def busy_ns(self):
+        return sum(t.end_ns - t.start_ns for t in self.log)
+
+    def load(self):
+        """Fraction of time the bus has been busy since it was created"""
+        elapsed = clock.now_ns - self._start_ns
+        return self.busy_ns / elapsed if elapsed else 0.0
+
+    def _request(self, chip):
+        if not self._busy:
+            self._busy = True
+            clock.call_at(clock.now_ns, self._arbitrate)
+
+    def in_step(self, chip):
+        """True if a node's bit rate is within 1% of the bus's"""
+        return abs(chip.bit_rate - self.baudrate) <= self.baudrate / 100
+
+    def _arbitrate(self):
+        contenders = []
+        for chip in self.nodes:
+            if chip.mode != MODE_NORMAL:
+                continue
+
+            # A node out of step can't win, its frames only cause errors
+            if not self.in_step(chip):
+                pending = chip.pending_frame()
+                if pending is not None:
+                    chip.start_transmit(pending[0])
+                    clock.call_at(
+                        clock.now_ns + _ERROR_FRAME_BITS * self._bit_ns,
+                        self._complete,
+                        [(None, chip, pending[0], pending[1])],
+                        clock.now_ns,
+                        True,
+                        False,
+                    )
+                    return
+                continue
+
+            pending = chip.pending_frame()
+            if pending is not None:
+                index, frame = pending
+                contenders.append((arbitration_bits(frame), chip, index, frame))
+
+        if not contenders:
+            self._busy = False
+            return
+
+        contenders.sort(key=lambda c: c[0])
+        winning_bits = contenders[0][0]
+        winners = [c for c in contenders if c[0] == winning_bits]
+        for _, chip, index, _ in contenders[len(winners) :]:
+            chip.transmit_failed(index, lose_arbitration=True)
+
+        for _, chip, index, _ in winners:
+            chip.start_transmit(index)
+
+        frame = winners[0][3]
+        start_ns = clock.now_ns
+
+        # Nodes sending the same arbitration field with different data collide in the data field
+        error = any(w[3] != frame for w in winners[1:])
+        error = error or self._random.random() < self.error_rate
+
+        # Any other node in normal mode acknowledges, whatever its filters
+        senders = [w[1] for w in winners]
+        acked = any(
+            node.mode == MODE_NORMAL and self.in_step(node)
+            for node in self.nodes
+            if node not in senders
+        )
+
+        if error:
+            end_ns = start_ns + (_ERROR_FRAME_BITS + len(arbitration_bits(frame)) + 1) * self._bit_ns
+        else:
+            end_ns = start_ns + frame_bits(frame) * self._bit_ns
+
+        clock.call_at(end_ns, self._complete, winners, start_ns, error, acked)
+
+    def _complete(self, winners, start_ns, error, acked):
+        ok = not error and acked
+        for _, chip, index, frame in winners:
+            self.log.append(
+                Transfer(start_ns, clock.now_ns, frame, chip, chip.requested_ns[index], ok)
+            )
+
+            tec = chip.register(TEC)
+            if ok:
+                chip.transmit_done(index)
+                self._set_counters(chip, max(tec - 1, 0), chip.register(REC))
+            else:
+                chip.transmit_failed(index)
+                # An error passive node doesn't count missing ACKs
+                if error or tec < 128:
+                    tec += 8
+                self._set_counters(chip, tec, chip.register(REC))
+
+        senders = [w[1] for w in winners]
+        for node in self.nodes:
+            if node in senders or node.mode not in (MODE_NORMAL, MODE_LISTENONLY):
+                continue
+
+            if not self.in_step(node):
+                continue
+
+            rec = node.register(REC)
+            if ok:
+                node.receive(winners[0][3])
+                self._set_counters(node, node.register(TEC), max(rec - 1, 0))
+            elif error:
+                self._set_counters(node, node.register(TEC), rec + 1)
+
+        self._arbitrate()
+
+    @staticmethod
+    def _set_counters(chip, tec, rec):
+        # TEC past 255 is bus off, REC stops counting at error passive
+        chip.set_error_counters(tec, min(rec, 128))
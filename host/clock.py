@@ -0,0 +1,106 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Virtual clock and MicroPython time.ticks_* functions
+#
+# Time only moves when something advances the clock: the event loop when
+# every task is waiting, SPI transfers by their duration on the wire, or
+# a test calling advance(). Events scheduled with call_at() (pin
+# waveforms, frames arriving from the bus) run as the clock passes them,
+# like interrupts.
+
+import heapq
+
+# MicroPython ticks wrap at 2**30 on all ports
+TICKS_PERIOD = 1 << 30
+TICKS_MAX = TICKS_PERIOD - 1
+TICKS_HALFPERIOD = TICKS_PERIOD // 2
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & TICKS_MAX
+
+
+def ticks_diff(ticks1, ticks2):
+    return ((ticks1 - ticks2 + TICKS_HALFPERIOD) & TICKS_MAX) - TICKS_HALFPERIOD
+
+
+class Clock:
+    """Virtual time in nanoseconds
+
+    :param int start_us: Initial time. Use a value near a multiple of 2**30 to exercise
+        ticks_us() wraparound.
+    """
+
+    def __init__(self, start_us=0):
+        self.reset(start_us)
+
+    def reset(self, start_us=0):
+        """Set the time and discard scheduled events"""
+        self.now_ns = start_us * 1000
+        self._events = []
+        self._seq = 0
+
+    def ticks_ms(self):
+        return (self.now_ns // 1000000) & TICKS_MAX
+
+    def ticks_us(self):
+        return (self.now_ns // 1000) & TICKS_MAX
+
+    def ticks_cpu(self):
+        return self.now_ns & TICKS_MAX
+
+    def call_at(self, time_ns, callback, *args):
+        """Run callback(*args) when the clock reaches time_ns"""
+        heapq.heappush(self._events, (time_ns, self._seq, callback, args))
+        self._seq += 1
+
+    def call_later(self, delay_us, callback, *args):
+        self.call_at(self.now_ns + int(delay_us * 1000), callback, *args)
+
+    def next_event(self):
+        """Time of the next scheduled event, or None"""
+        return self._events[0][0] if self._events else None
+
+    def advance(self, delta_ns, stop_on_event=False):
+        """Move the clock forward, running events that fall due. With stop_on_event the clock
+        stops at the first event run. Returns True if an event was run"""
+        return self.advance_to(self.now_ns + delta_ns, stop_on_event)
+
+    def advance_to(self, time_ns, stop_on_event=False):
+        ran = False
+        events = self._events
+        while events and events[0][0] <= time_ns:
+            event_ns, _, callback, args = heapq.heappop(events)
+            self.now_ns = max(self.now_ns, event_ns)
+            callback(*args)
+            ran = True
+            if stop_on_event:
+                return True
+
+        self.now_ns = max(self.now_ns, time_ns)
+        return ran
+
+    def sleep_ms(self, ms):
+        self.advance(ms * 1000000)
+
+    def sleep_us(self, us):
+        self.advance(us * 1000)
+
+
+# The clock shared by everything on the host
+clock = Clock()
@@ -0,0 +1,122 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Host version of the MicroPython machine module, installed as "machine"
+# by host.install(). Hardware comes from the current board.
+
+from . import mcp2515
+from .board import DEFAULT_SPI_BAUDRATE, current_board
+from .clock import clock
+
+
+class Pin(mcp2515.Pin):
+    """machine.Pin returning the current board's pin with the given number"""
+
+    def __new__(cls, pin_id, mode=-1, pull=-1, *, value=None, **kwargs):
+        pin = current_board().pin(pin_id)
+        if value is not None:
+            pin.value(value)
+        return pin
+
+
+class SPI:
+    """machine.SPI on the current board. Transfers advance the clock by their time on the wire"""
+
+    def __init__(self, spi_id, baudrate=DEFAULT_SPI_BAUDRATE, **kwargs):
+        self._devices = current_board().spi_buses.get(spi_id, [])
+        self.init(baudrate)
+
+    def init(self, baudrate=DEFAULT_SPI_BAUDRATE, **kwargs):
+        self._byte_ns = 8 * 1000000000 // baudrate
+
+    def deinit(self):
+        pass
+
+    def _clock(self, byte):
+        # MISO idles high, only the selected device drives it
+        result = 0xFF
+        for device in self._devices:
+            result &= device.clock(byte)
+        clock.advance(self._byte_ns)
+        return result
+
+    def write(self, buf):
+        for byte in buf:
+            self._clock(byte)
+
+    def read(self, nbytes, write=0x00):
+        return bytes(self._clock(write) for _ in range(nbytes))
+
+    def readinto(self, buf, write=0x00):
+        for idx in range(len(buf)):
+            buf[idx] = self._clock(write)
+
+    def write_readinto(self, write_buf, read_buf):
+        for idx, byte in enumerate(write_buf):
+            read_buf[idx] = self._clock(byte)
+
+
+class Timer:
+    """machine.Timer on the virtual clock. Callbacks run as the clock passes them, like
+    interrupts"""
+
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, timer_id=-1, **kwargs):
+        # Bumped on each init() or deinit() so a superseded expiry does nothing
+        self._generation = 0
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, *, mode=PERIODIC, freq=-1, period=-1, callback=None):
+        self._generation += 1
+        if freq > 0:
+            period_us = 1000000 / freq
+        else:
+            period_us = period * 1000
+
+        self._mode = mode
+        self._period_us = period_us
+        self._callback = callback
+        clock.call_later(period_us, self._expire, self._generation)
+
+    def deinit(self):
+        self._generation += 1
+
+    def _expire(self, generation):
+        if generation != self._generation:
+            return
+
+        if self._mode == Timer.PERIODIC:
+            clock.call_later(self._period_us, self._expire, generation)
+        if self._callback is not None:
+            self._callback(self)
+
+
+def UART(uart_id, baudrate=115200, **kwargs):
+    uart = current_board().uart(uart_id)
+    uart.baudrate = baudrate
+    return uart
+
+
+def unique_id():
+    return current_board().unique_id
+
+
+def reset():
+    raise SystemExit("machine.reset()")
@@ -0,0 +1,702 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Register level MCP2515 emulator
+#
+# Models the SPI command set, register map, acceptance filtering with
+# RXB0 to RXB1 rollover, interrupt flags and INT output, and transmit
+# buffer control well enough to run the driver in magsensor.mcp2515
+# unmodified under CPython. Bit timing is not modelled, a frame is
+# received the moment it is injected and, by default, sent the moment
+# it is requested.
+
+from collections import namedtuple
+
+from .clock import clock
+
+# SPI commands
+RESET = 0xC0
+READ = 0x03
+WRITE = 0x02
+BITMOD = 0x05
+LOAD_TX = 0x40
+RTS = 0x80
+READ_STATUS = 0xA0
+READ_RX = 0x90
+RX_STATUS = 0xB0
+
+# Registers. CANSTAT and CANCTRL appear at the end of every 16 byte row
+BFPCTRL = 0x0C
+TXRTSCTRL = 0x0D
+CANSTAT = 0x0E
+CANCTRL = 0x0F
+TEC = 0x1C
+REC = 0x1D
+CNF3 = 0x28
+CNF2 = 0x29
+CNF1 = 0x2A
+CANINTE = 0x2B
+CANINTF = 0x2C
+EFLG = 0x2D
+TXBCTRL = (0x30, 0x40, 0x50)
+RXBCTRL = (0x60, 0x70)
+RXF = (0x00, 0x04, 0x08, 0x10, 0x14, 0x18)
+RXM = (0x20, 0x24)
+
+# Operating modes, CANCTRL.REQOP and CANSTAT.OPMOD
+MODE_NORMAL = 0x00
+MODE_SLEEP = 0x20
+MODE_LOOPBACK = 0x40
+MODE_LISTENONLY = 0x60
+MODE_CONFIG = 0x80
+MODE_MASK = 0xE0
+
+# CANCTRL bits
+ABAT = 0x10
+OSM = 0x08
+
+# CANINTF/CANINTE bits
+RX0IF = 0x01
+RX1IF = 0x02
+TX0IF = 0x04
+ERRIF = 0x20
+
+# TXBnCTRL bits
+ABTF = 0x40
+MLOA = 0x20
+TXERR = 0x10
+TXREQ = 0x08
+TXP = 0x03
+
+# RXBnCTRL bits
+RXM_OFF = 0x60
+RXRTR = 0x08
+BUKT = 0x04
+BUKT1 = 0x02
+
+# EFLG bits
+RX1OVR = 0x80
+RX0OVR = 0x40
+TXBO = 0x20
+TXEP = 0x10
+RXEP = 0x08
+TXWAR = 0x04
+RXWAR = 0x02
+EWARN = 0x01
+
+# SIDL bits
+SRR = 0x10
+IDE = 0x08
+
+# DLC bits
+RTR = 0x40
+
+# Registers that respond to BIT MODIFY, writing any other uses a mask of 0xFF
+_BITMOD_REGS = frozenset(
+    (BFPCTRL, TXRTSCTRL, CANCTRL, CNF3, CNF2, CNF1, CANINTE, CANINTF, EFLG)
+    + TXBCTRL
+    + RXBCTRL
+)
+
+# Registers only writable in configuration mode
+_CONFIG_REGS = frozenset(
+    [addr + n for addr in RXF + RXM for n in range(4)]
+    + [CNF1, CNF2, CNF3]
+)
+
+Frame = namedtuple("Frame", ["id", "data", "extended", "rtr"])
+Frame.__doc__ = """A CAN frame. `data` is bytes, for a remote frame its length is the DLC"""
+
+
+def encode_id(can_id, extended):
+    """SIDH, SIDL, EID8 and EID0 register values for an ID"""
+    if extended:
+        sid = can_id >> 18
+        eid = can_id & 0x3FFFF
+        return bytes(
+            [sid >> 3, ((sid & 0x07) << 5) | IDE | (eid >> 16), (eid >> 8) & 0xFF, eid & 0xFF]
+        )
+
+    return bytes([can_id >> 3, (can_id & 0x07) << 5, 0, 0])
+
+
+def decode_id(regs):
+    """(id, extended) from SIDH, SIDL, EID8 and EID0 register values"""
+    sid = (regs[0] << 3) | (regs[1] >> 5)
+    if regs[1] & IDE:
+        return (sid << 18) | ((regs[1] & 0x03) << 16) | (regs[2] << 8) | regs[3], True
+
+    return sid, False
+
+
+class Pin:
+    """Host stand-in for a machine.Pin driven by the emulator"""
+
+    IN = 0
+    OUT = 1
+    PULL_UP = 1
+    IRQ_FALLING = 4
+    IRQ_RISING = 8
+
+    def __init__(self, value=1, on_change=None):
+        self._value = value
+        self._on_change = on_change
+        self._handler = None
+        self._trigger = 0
+
+    def value(self, val=None):
+        if val is None:
+            return self._value
+
+        self.drive(1 if val else 0)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING, hard=False):
+        self._handler = handler
+        self._trigger = trigger
+
+    def drive(self, val):
+        if val == self._value:
+            return
+
+        self._value = val
+        if self._on_change is not None:
+            self._on_change(val)
+
+        edge = self.IRQ_RISING if val else self.IRQ_FALLING
+        if self._handler is not None and self._trigger & edge:
+            self._handler(self)
+
+
+class SPI:
+    """Host stand-in for a machine.SPI connected to the emulator"""
+
+    def __init__(self, chip):
+        self._chip = chip
+
+    def write(self, buf):
+        for byte in buf:
+            self._chip.clock(byte)
+
+    def read(self, nbytes, write=0x00):
+        return bytes(self._chip.clock(write) for _ in range(nbytes))
+
+    def readinto(self, buf, write=0x00):
+        for idx in range(len(buf)):
+            buf[idx] = self._chip.clock(write)
+
+    def write_readinto(self, write_buf, read_buf):
+        for idx, byte in enumerate(write_buf):
+            read_buf[idx] = self._chip.clock(byte)
+
+
+class MCP2515Emulator:
+    """An emulated MCP2515. Connect the driver to `spi`, `cs` and `int_pin`, put frames on
+    its receive side with `receive()` and collect what it transmits from `outbox`.
+
+    :param bool auto_transmit: Send a frame as soon as its transmit buffer is requested. When
+        False frames wait for `transmit()`, so buffer priority and aborts can be exercised.
+    :param on_transmit: Optional callback taking each `Frame` sent in normal mode
+    :param on_request: Optional callback taking the emulator, called instead of sending when
+        transmission is requested and `auto_transmit` is False. Used by a simulated bus.
+    :param int crystal_freq: Oscillator frequency, for the bit rate set by CNF1-3
+    """
+
+    def __init__(self, auto_transmit=True, on_transmit=None, on_request=None, crystal_freq=16000000):
+        self.auto_transmit = auto_transmit
+        self.crystal_freq = crystal_freq
+        self.on_transmit = on_transmit
+        self.on_request = on_request
+        self.outbox = []
+
+        # Virtual time each transmit buffer was last requested
+        self.requested_ns = [None, None, None]
+
+        # Buffer being sent on a simulated bus, an abort only takes effect if it fails
+        self.transmitting = None
+        self._abort_pending = False
+
+        self.spi = SPI(self)
+        self.cs = Pin(1, on_change=self._cs_change)
+        self.int_pin = Pin(1)
+
+        # SPI bytes clocked and chip select cycles
+        self.spi_bytes = 0
+        self.transactions = 0
+
+        # Accepted frames lost because both receive buffers were full
+        self.overflows = 0
+
+        self._regs = bytearray(0x80)
+        self._last_rx = None
+        self._txn = None
+        self.reset()
+
+    # ------------------------------------------------------------------
+    # Bus side
+
+    def receive(self, frame):
+        """Offer a frame from the bus to the acceptance filters. Returns the receive buffer it was
+        stored in, or None if it was rejected or lost to overflow"""
+        mode = self.mode
+        if mode == MODE_CONFIG or mode == MODE_SLEEP:
+            return None
+
+        regs = self._regs
+        hit0 = self._match(frame, 0)
+        if hit0 is not None:
+            if not regs[CANINTF] & RX0IF:
+                result = self._store(0, frame, hit0, hit0)
+            elif regs[RXBCTRL[0]] & BUKT:
+                if not regs[CANINTF] & RX1IF:
+                    result = self._store(1, frame, hit0, hit0 + 6)
+                else:
+                    result = self._overflow(RX1OVR)
+            else:
+                result = self._overflow(RX0OVR)
+        else:
+            hit1 = self._match(frame, 1)
+            if hit1 is None:
+                return None
+
+            if not regs[CANINTF] & RX1IF:
+                result = self._store(1, frame, hit1, hit1)
+            else:
+                result = self._overflow(RX1OVR)
+
+        self._update_int()
+        return result
+
+    def transmit(self, lose_arbitration=False, error=False):
+        """Attempt to send the highest priority pending frame. With `lose_arbitration` or `error`
+        the attempt fails and, unless one-shot mode is set, the frame stays pending. Returns the
+        `Frame` sent, or None"""
+        index = self.pending_buffer()
+        if index is None:
+            return None
+
+        if lose_arbitration or error:
+            self.transmit_failed(index, lose_arbitration)
+            return None
+
+        return self.transmit_done(index)
+
+    def start_transmit(self, index):
+        """Mark a buffer as being sent, from the end of arbitration to `transmit_done()` or
+        `transmit_failed()`"""
+        self.transmitting = index
+        self._abort_pending = False
+
+    def pending_frame(self):
+        """(buffer index, `Frame`) the controller would send next, or None"""
+        index = self.pending_buffer()
+        if index is None:
+            return None
+
+        return index, self._tx_frame(index)
+
+    def transmit_done(self, index):
+        """Complete transmission from a buffer, returns the `Frame` sent"""
+        regs = self._regs
+        frame = self._tx_frame(index)
+        self.transmitting = None
+
+        regs[TXBCTRL[index]] &= ~TXREQ
+        regs[CANINTF] |= TX0IF << index
+
+        if self.mode == MODE_LOOPBACK:
+            self.receive(frame)
+        else:
+            self.outbox.append(frame)
+            if self.on_transmit is not None:
+                self.on_transmit(frame)
+
+        self._update_int()
+        return frame
+
+    def transmit_failed(self, index, lose_arbitration=False):
+        """Fail a transmission attempt by lost arbitration or a bus error. The frame stays pending
+        unless one-shot mode is set"""
+        regs = self._regs
+        addr = TXBCTRL[index]
+
+        regs[addr] |= MLOA if lose_arbitration else TXERR
+        if regs[CANCTRL] & OSM or (index == self.transmitting and self._abort_pending):
+            regs[addr] = (regs[addr] & ~TXREQ) | ABTF
+        if not lose_arbitration:
+            regs[CANINTF] |= ERRIF
+        if index == self.transmitting:
+            self.transmitting = None
+        self._update_int()
+
+    def pending_buffer(self):
+        """Index of the transmit buffer the controller would send next, or None. The highest TXP
+        wins, then the highest buffer number"""
+        if self.mode not in (MODE_NORMAL, MODE_LOOPBACK) or self._regs[EFLG] & TXBO:
+            return None
+
+        best = None
+        for index in range(3):
+            ctrl = self._regs[TXBCTRL[index]]
+            if ctrl & TXREQ and (best is None or ctrl & TXP >= self._regs[TXBCTRL[best]] & TXP):
+                best = index
+        return best
+
+    def set_error_counters(self, tec, rec):
+        """Set TEC and REC, updating the EFLG error state bits to match"""
+        regs = self._regs
+        regs[TEC] = min(tec, 255)
+        regs[REC] = min(rec, 255)
+
+        flags = regs[EFLG] & (RX1OVR | RX0OVR)
+        if tec > 255:
+            flags |= TXBO
+        if tec >= 128:
+            flags |= TXEP
+        if rec >= 128:
+            flags |= RXEP
+        if tec >= 96:
+            flags |= TXWAR
+        if rec >= 96:
+            flags |= RXWAR
+        if tec >= 96 or rec >= 96:
+            flags |= EWARN
+
+        if flags != regs[EFLG]:
+            regs[EFLG] = flags
+            regs[CANINTF] |= ERRIF
+            self._update_int()
+
+    # ------------------------------------------------------------------
+    # Inspection
+
+    @property
+    def mode(self):
+        return self._regs[CANSTAT] & MODE_MASK
+
+    def register(self, addr):
+        """Read a register without side effects"""
+        return self._read(addr)
+
+    @property
+    def bit_rate(self):
+        """Bit rate set by CNF1-3 in Hz"""
+        regs = self._regs
+        prop_seg = (regs[CNF2] & 0x07) + 1
+        ps1 = ((regs[CNF2] >> 3) & 0x07) + 1
+        if regs[CNF2] & 0x80:
+            ps2 = (regs[CNF3] & 0x07) + 1
+        else:
+            ps2 = max(ps1, 2)
+
+        tq_per_bit = 1 + prop_seg + ps1 + ps2
+        return self.crystal_freq / (2 * ((regs[CNF1] & 0x3F) + 1) * tq_per_bit)
+
+    # ------------------------------------------------------------------
+    # Reset and SPI
+
+    def reset(self):
+        """Power on / RESET command state"""
+        self._regs[:] = bytes(len(self._regs))
+        self._regs[CANSTAT] = MODE_CONFIG
+        self._regs[CANCTRL] = MODE_CONFIG | 0x07
+        self._last_rx = None
+        self._update_int()
+
+    def _cs_change(self, level):
+        if not level:
+            self._txn = []
+            self.transactions += 1
+            return
+
+        txn, self._txn = self._txn, None
+        if txn and txn[0] & 0xF9 == READ_RX and len(txn) > 1:
+            # Raising CS after READ RX clears the buffer's interrupt flag
+            self._regs[CANINTF] &= ~(RX0IF if txn[0] & 0x04 == 0 else RX1IF)
+            self._update_int()
+        elif self.auto_transmit or self.mode == MODE_LOOPBACK:
+            self._transmit_all()
+        elif self.on_request is not None and self.pending_buffer() is not None:
+            self.on_request(self)
+
+    def clock(self, byte):
+        """Exchange one byte over SPI, returning the byte from SO"""
+        self.spi_bytes += 1
+        txn = self._txn
+        if txn is None:
+            # Chip not selected
+            return 0xFF
+
+        txn.append(byte)
+        cmd = txn[0]
+        pos = len(txn) - 1
+
+        if pos == 0:
+            if cmd == RESET:
+                self.reset()
+            elif cmd & 0xF8 == RTS and cmd != RTS:
+                for index in range(3):
+                    if cmd & (1 << index):
+                        self._write(TXBCTRL[index], self._regs[TXBCTRL[index]] | TXREQ)
+            return 0xFF
+
+        if cmd == READ:
+            if pos == 1:
+                return 0xFF
+            return self._read((txn[1] + pos - 2) & 0x7F)
+
+        if cmd == WRITE:
+            if pos >= 2:
+                self._write((txn[1] + pos - 2) & 0x7F, byte)
+            return 0xFF
+
+        if cmd == BITMOD:
+            if pos == 3:
+                addr, mask = txn[1], txn[2]
+                if addr not in _BITMOD_REGS:
+                    mask = 0xFF
+                self._write(addr, (self._read(addr) & ~mask) | (byte & mask))
+            return 0xFF
+
+        if cmd & 0xF8 == LOAD_TX and cmd & 0x07 < 6:
+            # 0x40 TXB0SIDH, 0x41 TXB0D0, 0x42 TXB1SIDH ...
+            index = (cmd & 0x07) >> 1
+            start = TXBCTRL[index] + (6 if cmd & 0x01 else 1)
+            addr = start + pos - 1
+            if addr < TXBCTRL[index] + 14:
+                self._write(addr, byte)
+            return 0xFF
+
+        if cmd & 0xF9 == READ_RX:
+            # 0x90 RXB0SIDH, 0x92 RXB0D0, 0x94 RXB1SIDH, 0x96 RXB1D0
+            index = (cmd & 0x04) >> 2
+            start = RXBCTRL[index] + (6 if cmd & 0x02 else 1)
+            addr = start + pos - 1
+            return self._regs[addr] if addr < RXBCTRL[index] + 14 else 0xFF
+
+        if cmd == READ_STATUS:
+            return self._read_status()
+
+        if cmd == RX_STATUS:
+            return self._rx_status()
+
+        return 0xFF
+
+    # ------------------------------------------------------------------
+    # Registers
+
+    def _read(self, addr):
+        if addr & 0x0F == 0x0E:
+            return self._canstat()
+        if addr & 0x0F == 0x0F:
+            return self._regs[CANCTRL]
+        return self._regs[addr]
+
+    def _write(self, addr, value):
+        regs = self._regs
+        row = addr & 0x0F
+        if row == 0x0E or addr in (TEC, REC):
+            # Read only
+            return
+
+        if row == 0x0F:
+            self._write_canctrl(value)
+            return
+
+        if addr in _CONFIG_REGS and self.mode != MODE_CONFIG:
+            return
+
+        if addr == EFLG:
+            # Only the overflow flags can be cleared
+            regs[EFLG] &= value | ~(RX1OVR | RX0OVR)
+        elif addr in TXBCTRL:
+            self._write_txbctrl(addr, value)
+        elif addr in RXBCTRL:
+            # FILHIT and RXRTR are read only, BUKT1 is a copy of BUKT
+            if addr == RXBCTRL[0]:
+                value &= RXM_OFF | BUKT
+                if value & BUKT:
+                    value |= BUKT1
+                regs[addr] = value | (regs[addr] & (RXRTR | 0x01))
+            else:
+                regs[addr] = (value & RXM_OFF) | (regs[addr] & (RXRTR | 0x07))
+        else:
+            regs[addr] = value
+
+        if addr in (CANINTE, CANINTF):
+            self._update_int()
+
+    def _write_canctrl(self, value):
+        regs = self._regs
+        regs[CANCTRL] = value
+
+        # Mode changes take effect at once
+        regs[CANSTAT] = (regs[CANSTAT] & ~MODE_MASK) | (value & MODE_MASK)
+
+        if value & ABAT:
+            for index, addr in enumerate(TXBCTRL):
+                if index == self.transmitting:
+                    self._abort_pending = True
+                elif regs[addr] & TXREQ:
+                    regs[addr] = (regs[addr] & ~TXREQ) | ABTF
+
+    def _write_txbctrl(self, addr, value):
+        regs = self._regs
+        old = regs[addr]
+        new = (old & (ABTF | MLOA | TXERR)) | (value & (TXREQ | TXP))
+
+        if value & TXREQ and not old & TXREQ:
+            # Requesting transmission clears the previous outcome
+            new &= ~(ABTF | MLOA | TXERR)
+            self.requested_ns[TXBCTRL.index(addr)] = clock.now_ns
+        elif old & TXREQ and not value & TXREQ:
+            if TXBCTRL.index(addr) == self.transmitting:
+                # A frame on the bus carries on, and is only aborted if it fails
+                new |= TXREQ
+                self._abort_pending = True
+            else:
+                # Clearing a pending request aborts it
+                new |= ABTF
+        regs[addr] = new
+
+    def _canstat(self):
+        # ICOD reports the highest priority enabled interrupt
+        regs = self._regs
+        pending = regs[CANINTF] & regs[CANINTE]
+        icod = 0
+        for bit, code in ((0x20, 1), (0x40, 7), (0x04, 2), (0x08, 3), (0x10, 4), (0x01, 5), (0x02, 6)):
+            if pending & bit:
+                icod = code
+                break
+        return (regs[CANSTAT] & MODE_MASK) | (icod << 1)
+
+    def _read_status(self):
+        regs = self._regs
+        flags = regs[CANINTF]
+        status = flags & (RX0IF | RX1IF)
+        for index, (req_bit, if_bit) in enumerate(((0x04, 0x08), (0x10, 0x20), (0x40, 0x80))):
+            if regs[TXBCTRL[index]] & TXREQ:
+                status |= req_bit
+            if flags & (TX0IF << index):
+                status |= if_bit
+        return status
+
+    def _rx_status(self):
+        flags = self._regs[CANINTF]
+        status = (flags & (RX0IF | RX1IF)) << 6
+        if self._last_rx is not None:
+            # Type and filter of the last message received
+            frame, code = self._last_rx
+            status |= (0x10 if frame.extended else 0) | (0x08 if frame.rtr else 0) | code
+        return status
+
+    def _update_int(self):
+        regs = self._regs
+        self.int_pin.drive(0 if regs[CANINTF] & regs[CANINTE] else 1)
+
+    # ------------------------------------------------------------------
+    # Receive
+
+    def _match(self, frame, rx_index):
+        """Index of the first filter of a receive buffer accepting the frame, or None"""
+        regs = self._regs
+        filters = (0, 1) if rx_index == 0 else (2, 3, 4, 5)
+
+        if regs[RXBCTRL[rx_index]] & RXM_OFF == RXM_OFF:
+            return filters[0]
+
+        mask = self._filter_value(RXM[rx_index])
+        value = self._frame_filter_value(frame)
+        for filter_index in filters:
+            addr = RXF[filter_index]
+            if bool(regs[addr + 1] & IDE) != frame.extended:
+                continue
+            if (value ^ self._filter_value(addr)) & mask == 0:
+                return filter_index
+        return None
+
+    def _filter_value(self, addr):
+        # 11 bit SID above 18 bit EID
+        regs = self._regs
+        sid = (regs[addr] << 3) | (regs[addr + 1] >> 5)
+        eid = ((regs[addr + 1] & 0x03) << 16) | (regs[addr + 2] << 8) | regs[addr + 3]
+        return (sid << 18) | eid
+
+    @staticmethod
+    def _frame_filter_value(frame):
+        if frame.extended:
+            return frame.id
+
+        # For standard frames the EID bits filter on the first two data bytes
+        data = b"" if frame.rtr else frame.data
+        byte0 = data[0] if len(data) > 0 else 0
+        byte1 = data[1] if len(data) > 1 else 0
+        return (frame.id << 18) | (byte0 << 8) | byte1
+
+    def _store(self, rx_index, frame, filter_index, code):
+        regs = self._regs
+        base = RXBCTRL[rx_index]
+
+        id_regs = bytearray(encode_id(frame.id, frame.extended))
+        dlc = len(frame.data)
+        if frame.rtr:
+            if frame.extended:
+                dlc |= RTR
+            else:
+                id_regs[1] |= SRR
+
+        regs[base + 1 : base + 5] = id_regs
+        regs[base + 5] = dlc
+        data = b"" if frame.rtr else frame.data
+        regs[base + 6 : base + 6 + len(data)] = data
+
+        # FILHIT is one bit in RXB0CTRL, three in RXB1CTRL
+        filhit_mask = 0x01 if rx_index == 0 else 0x07
+        ctrl = regs[base] & ~(RXRTR | filhit_mask)
+        if frame.rtr:
+            ctrl |= RXRTR
+        regs[base] = ctrl | filter_index
+
+        regs[CANINTF] |= RX0IF if rx_index == 0 else RX1IF
+        self._last_rx = (frame, code)
+        return rx_index
+
+    def _overflow(self, bit):
+        self.overflows += 1
+        self._regs[EFLG] |= bit
+        self._regs[CANINTF] |= ERRIF
+        return None
+
+    # ------------------------------------------------------------------
+    # Transmit
+
+    def _transmit_all(self):
+        while True:
+            index = self.pending_buffer()
+            if index is None:
+                break
+            self.transmit_done(index)
+
+    def _tx_frame(self, index):
+        regs = self._regs
+        addr = TXBCTRL[index]
+
+        can_id, extended = decode_id(regs[addr + 1 : addr + 5])
+        dlc = regs[addr + 5]
+        length = min(dlc & 0x0F, 8)
+        rtr = bool(dlc & RTR)
+        data = bytes(length) if rtr else bytes(regs[addr + 6 : addr + 6 + length])
+        return Frame(can_id, data, extended, rtr)
@@ -0,0 +1,88 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Check transmit priority ordering: two ACKs and a ding are queued while
+# the bus is busy, filling all three transmit buffers. The ding must go
+# first and the ACKs in the order they were sent. Then three ACKs fill
+# the buffers and one is sent: a fourth ACK must wait for the other two
+# rather than take the freed TXB2 and overtake them. Checked with and
+# without fast_send, exits with an error on a wrong order.
+#
+#   python -m host.priority
+
+import host
+
+host.install()
+
+from magsensor import msgid, sensor
+from magsensor.mcp2515 import MCP2515
+from magsensor.mcp2515.canio import Message
+
+EXPECTED = [msgid.BELL + 1, msgid.ACK + 1, msgid.ACK + 2]
+REFILL_EXPECTED = [msgid.ACK + n for n in range(1, 5)]
+
+# Hold frames in the controller until the bus is free
+chip = host.default_board.add_mcp2515(auto_transmit=False)
+spi, cs = host.machine.SPI(0), host.machine.Pin(9)
+
+
+def ack(n):
+    return Message(msgid.ACK + n, b"", priority=sensor.ACK_PRIORITY)
+
+
+def check_full(can):
+    try:
+        can.send(ack(9))
+    except RuntimeError:
+        return
+    raise AssertionError("A frame was loaded ahead of pending ones")
+
+
+def check(name, expected):
+    order = [frame.id for frame in chip.outbox]
+    print("{:<16} {}".format(name, ", ".join("{:03x}".format(i) for i in order)))
+    assert order == expected, "{} send order is wrong".format(name)
+
+
+for fast_send in (False, True):
+    name = "fast" if fast_send else "standard"
+    can = MCP2515(spi, cs, fast_send=fast_send)
+    can.send(ack(1))
+    can.send(ack(2))
+    can.send(Message(msgid.BELL + 1, b"\x00\x00", priority=sensor.DING_PRIORITY))
+
+    # Every buffer is in use, so a fourth frame has nowhere to go
+    check_full(can)
+
+    del chip.outbox[:]
+    while chip.transmit():
+        pass
+    check(name, EXPECTED)
+
+    # Send one of three ACKs, the fourth waits until the other two have gone
+    del chip.outbox[:]
+    for n in range(1, 4):
+        can.send(ack(n))
+    chip.transmit()
+    check_full(can)
+    chip.transmit()
+    check_full(can)
+    chip.transmit()
+    can.send(ack(4))
+    while chip.transmit():
+        pass
+    check(name + " refill", REFILL_EXPECTED)
@@ -0,0 +1,53 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Run a board script unmodified on the host, with an emulated MCP2515 on
+# SPI 0 using the pins from magsensor, for example
+#
+#   python -m host.run bench/send.py
+#   python -m host.run --until-ms 5000 main_test_rx.py
+
+import argparse
+import runpy
+import sys
+
+import host
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a MicroPython script on the host")
+    parser.add_argument("script", help="Script to run")
+    parser.add_argument("--until-ms", type=int, help="Stop asyncio.run() after this virtual time")
+    parser.add_argument("--start-us", type=int, default=0, help="Initial virtual time")
+    parser.add_argument(
+        "--quantum-us",
+        type=int,
+        default=host.aio.DEFAULT_QUANTUM_US,
+        help="Virtual time per scheduler pass",
+    )
+    parser.add_argument("--int-pin", type=int, help="Connect the MCP2515 INT output to this pin")
+    args = parser.parse_args()
+
+    host.install(start_us=args.start_us, quantum_us=args.quantum_us, until_ms=args.until_ms)
+    host.default_board.add_mcp2515(spi_id=0, cs_pin=9, int_pin=args.int_pin)
+
+    sys.argv = [args.script]
+    runpy.run_path(args.script, run_name="__main__")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# A tower on the simulated bus: one sensor node per bell and a receiver,
+# all running the unmodified application. Each bell passes its magnet
+# once per row, bells a fixed gap apart, and the report gives ding
+# latency, strike timing error at the receiver and bus load.
+#
+#   python -m host.sim
+#   python -m host.sim --bells 12 --rows 4 --gap-ms 0 --error-rate 0.05
+#
+# A gap of zero has every bell ding at once, the worst case queueing.
+#
+# All nodes share one event loop, so the time charged per scheduler pass
+# (--quantum-us) and each node's SPI transfers hold up every other node.
+# Latencies are upper bounds on what separate boards would see.
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+
+import host
+from host.board import Board
+from host.bus import CANBus
+
+# Wiring used by the simulated nodes
+INT_PIN = 20
+SENSOR_PIN = 21
+
+# Magnet pulse width and time before the first row
+PULSE_MS = 30
+START_MS = 500
+
+# Time after the last row for the final strikes
+SETTLE_MS = 1000
+
+
+def percentiles(values):
+    if not values:
+        return "-"
+    values = sorted(values)
+    pick = lambda p: values[min(len(values) - 1, int(p * len(values)))]
+    return "min {:.2f}  median {:.2f}  p95 {:.2f}  max {:.2f}".format(
+        values[0], pick(0.5), pick(0.95), values[-1]
+    )
+
+
+def magnet_edges(bell, rows, gap_ms, row_ms):
+    """Times (ms) the magnet reaches the sensor of a bell"""
+    return [START_MS + row * row_ms + (bell - 1) * gap_ms for row in range(rows)]
+
+
+def waveform(edges_ms):
+    """Sensor pin waveform, active low, for magnet edges"""
+    wave, t = [], 0
+    for edge in edges_ms:
+        wave.append(((edge - t) * 1000, 0))
+        wave.append((PULSE_MS * 1000, 1))
+        t = edge + PULSE_MS
+    return wave
+
+
+async def tower(sensor, receive, sensors, receiver, duration_ms):
+    tasks = [board.run(sensor.main(bell)) for bell, board in sensors]
+    tasks.append(receiver.run(receive.main()))
+
+    await asyncio.sleep(duration_ms / 1000)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a tower of bell sensors")
+    parser.add_argument("--bells", type=int, default=12, help="number of sensors")
+    parser.add_argument("--rows", type=int, default=3, help="rows of rounds to ring")
+    parser.add_argument("--gap-ms", type=int, default=200, help="time between bells")
+    parser.add_argument("--delay-ms", type=int, default=300, help="receiver strike delay")
+    parser.add_argument("--baudrate", type=int, default=250000, help="CAN bit rate")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="chance of a bus error")
+    parser.add_argument("--quantum-us", type=int, default=20, help="time per scheduler pass")
+    parser.add_argument("--uart-binary", action="store_true", help="binary UART strike log")
+    args = parser.parse_args()
+
+    host.install(quantum_us=args.quantum_us)
+    from magsensor import receive, sensor, uartframe
+
+    sensor.CAN_INT_PIN = INT_PIN
+    receive.CAN_INT_PIN = INT_PIN
+    sensor.msgid.BAUDRATE = args.baudrate
+    receive.LOG_DIR = "log"
+    receive.UART_BINARY = args.uart_binary
+
+    bus = CANBus(args.baudrate, args.error_rate)
+
+    # Rows leave the same gap between the last bell and the next row's first
+    row_ms = max(args.bells * args.gap_ms, 2 * PULSE_MS + 100)
+    edges = {}
+    sensors = []
+    for bell in range(1, args.bells + 1):
+        board = Board(unique_id=bytes(7) + bytes([bell]))
+        bus.attach(board.add_mcp2515(int_pin=INT_PIN))
+        edges[bell] = magnet_edges(bell, args.rows, args.gap_ms, row_ms)
+        board.script(SENSOR_PIN, waveform(edges[bell]))
+        sensors.append((bell, board))
+
+    receiver = Board()
+    receiver_chip = receiver.add_mcp2515(int_pin=INT_PIN)
+    bus.attach(receiver_chip)
+
+    duration_ms = START_MS + args.rows * row_ms + SETTLE_MS
+    console = io.StringIO()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            with open("delays.json", "w") as f:
+                json.dump([args.delay_ms] * args.bells, f)
+            with contextlib.redirect_stdout(console):
+                asyncio.run(tower(sensor, receive, sensors, receiver, duration_ms))
+
+            # Strikes in flash when the run stopped, as after a power cut
+            logged = 0
+            for name in os.listdir(receive.LOG_DIR) if os.path.isdir(receive.LOG_DIR) else []:
+                logged += os.path.getsize(os.path.join(receive.LOG_DIR, name)) // 4
+        finally:
+            os.chdir(cwd)
+
+    # Dings on the bus, the sensor's own trigger delay is in the data
+    dings = [t for t in bus.log if t.frame.id & ~0xF == sensor.msgid.BELL]
+    sent = [t for t in dings if t.ok]
+    wait_ms = [(t.start_ns - t.requested_ns) / 1e6 for t in sent]
+    frame_ms = [(t.end_ns - t.start_ns) / 1e6 for t in sent]
+
+    # Strikes logged by the receiver against magnet edge + trigger delay + receiver delay.
+    # A sensor times its trigger delay from the previous pulse, so the first is zero
+    trigger_ms = [0] + [PULSE_MS // 2] * (args.rows - 1)
+    strike_err = []
+    start_ms = host.clock.ticks_ms() - duration_ms
+    output = receiver.uart(0).output
+    if args.uart_binary:
+        decoder = uartframe.FrameDecoder()
+        log = decoder.feed(output)
+    else:
+        log = [[int(x) for x in line.split(",")] for line in output.decode().split()]
+
+    for bell, strike in log:
+        # Binary records have the low 24 bits of the time
+        strike_ms = (strike - start_ms) & uartframe.TIME_MASK
+        ideal = [e + d + args.delay_ms for e, d in zip(edges[bell], trigger_ms)]
+        strike_err.append(min((strike_ms - t for t in ideal), key=abs))
+
+    errors = sum(1 for t in bus.log if not t.ok)
+    print("Nodes         {} sensors, 1 receiver at {} bit/s".format(args.bells, args.baudrate))
+    print("Magnet passes {}".format(args.bells * args.rows))
+    print("Dings sent    {} ({} bus errors or retries)".format(len(sent), errors))
+    print("Overflows     {} at the receiver".format(receiver_chip.overflows))
+    print("Strikes       {} ({} in the flash log)".format(len(log), logged))
+    print("UART bytes    {}".format(len(output)))
+    print("Bus wait ms   {}".format(percentiles(wait_ms)))
+    print("Frame ms      {}".format(percentiles(frame_ms)))
+    print("Strike err ms {}".format(percentiles(strike_err)))
+    print("Bus load      {:.2%}".format(bus.load()))
+
+    messages = [line for line in console.getvalue().splitlines() if line.strip(receive.BELLS)]
+    for line in sorted(set(messages)):
+        print("  {} x {}".format(messages.count(line), line))
+
+
+if __name__ == "__main__":
+    main()
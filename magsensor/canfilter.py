@@ -0,0 +1,211 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# MCP2515 acceptance filter compiler
+#
+# The MCP2515 has two masks, RXM0 shared by filters RXF0-1 and RXM1 shared
+# by RXF2-5. An ID is accepted by a filter if it equals the filter in every
+# bit set in the filter's mask. Given the IDs a node needs, split into
+# classes (one per message handler), find masks and filters accepting all
+# of them while accepting as few other IDs as possible, with every filter
+# belonging to a single class so the filter hit identifies the class.
+#
+# Each class is split into groups by the values of up to three ID bits,
+# and the groups shared between the two masks. A group's filter can only
+# care about bits on which all its IDs agree, so each mask is the
+# intersection of the agreement masks of its groups.
+
+ID_BITS = 11
+ID_MASK = (1 << ID_BITS) - 1
+N_FILTERS = (2, 4)
+
+# Bell numbers 0-15 in the low 4 bits of a message ID
+ALL_BELLS = range(16)
+
+
+# Message IDs for a msgid command and set of bells
+def command_ids(cmd, bells=ALL_BELLS):
+    return [cmd + bell for bell in bells]
+
+
+# Bits on which all IDs agree
+def _agree_mask(ids):
+    diff = 0
+    for can_id in ids:
+        diff |= can_id ^ ids[0]
+    return ~diff & ID_MASK
+
+
+def _popcount(x):
+    n = 0
+    while x:
+        x &= x - 1
+        n += 1
+    return n
+
+
+# All subsets of ID bits of size 0 to 3, as masks
+def _split_masks():
+    yield 0
+    for a in range(ID_BITS):
+        yield 1 << a
+        for b in range(a + 1, ID_BITS):
+            yield (1 << a) | (1 << b)
+            for c in range(b + 1, ID_BITS):
+                yield (1 << a) | (1 << b) | (1 << c)
+
+
+# Ways of choosing up to two of n groups for RXM0, leaving at most four
+def _mask0_choices(n):
+    choices = []
+    if n <= N_FILTERS[1]:
+        choices.append(())
+    for a in range(n):
+        if n - 1 <= N_FILTERS[1]:
+            choices.append((a,))
+        for b in range(a + 1, n):
+            choices.append((a, b))
+    return choices
+
+
+# Number of IDs accepted by groups sharing a mask
+def _cost(mask, groups):
+    values = set(group[0] & mask for group in groups)
+    return len(values) << (ID_BITS - _popcount(mask))
+
+
+def compile_filters(classes):
+    """Find masks and filters for a list of classes, each a list of
+    standard IDs. Returns (masks, filters, filter_class) where masks and
+    filters are suitable for MCP2515.load_filters() and filter_class gives
+    the class index for each of the six filters"""
+    classes = [sorted(set(ids)) for ids in classes]
+    if not any(classes):
+        raise ValueError("No IDs to accept")
+
+    best = None
+    for split in _split_masks():
+        # Group IDs by class and by value of the split bits
+        groups = {}
+        for class_idx, ids in enumerate(classes):
+            for can_id in ids:
+                groups.setdefault((class_idx, can_id & split), []).append(can_id)
+
+        if len(groups) > sum(N_FILTERS):
+            continue
+
+        keys = sorted(groups)
+        agree = [_agree_mask(groups[key]) for key in keys]
+
+        for mask0_groups in _mask0_choices(len(keys)):
+            mask1_groups = [i for i in range(len(keys)) if i not in mask0_groups]
+
+            mask0 = ID_MASK
+            for i in mask0_groups:
+                mask0 &= agree[i]
+            mask1 = ID_MASK
+            for i in mask1_groups:
+                mask1 &= agree[i]
+
+            # A wanted ID must not be accepted by another class's filter
+            assign = [(mask0, i) for i in mask0_groups] + [(mask1, i) for i in mask1_groups]
+            if not _routes_ok(assign, keys, groups):
+                continue
+
+            cost = _cost(mask0, [groups[keys[i]] for i in mask0_groups]) + _cost(
+                mask1, [groups[keys[i]] for i in mask1_groups]
+            )
+            if best is None or cost < best[0]:
+                best = (cost, mask0, mask1, mask0_groups, mask1_groups, keys, groups)
+
+    if best is None:
+        raise ValueError("Too many ID classes for the acceptance filters")
+
+    _, mask0, mask1, mask0_groups, mask1_groups, keys, groups = best
+
+    # An unused mask copies the other and repeats its filters
+    if not mask0_groups:
+        mask0, mask0_groups = mask1, mask1_groups[:1]
+    if not mask1_groups:
+        mask1, mask1_groups = mask0, mask0_groups[:1]
+
+    filters = []
+    filter_class = []
+    for mask, group_idxs, n_filters in (
+        (mask0, mask0_groups, N_FILTERS[0]),
+        (mask1, mask1_groups, N_FILTERS[1]),
+    ):
+        for n in range(n_filters):
+            key = keys[group_idxs[min(n, len(group_idxs) - 1)]]
+            filters.append(groups[key][0] & mask)
+            filter_class.append(key[0])
+
+    return [mask0, mask1], filters, filter_class
+
+
+def _routes_ok(assign, keys, groups):
+    for mask, i in assign:
+        value = groups[keys[i]][0] & mask
+        for _, j in assign:
+            if keys[j][0] == keys[i][0]:
+                continue
+            for can_id in groups[keys[j]]:
+                if can_id & mask == value:
+                    return False
+    return True
+
+
+# Filter index hit by an ID, or None. RXB0 filters are checked first
+def filter_hit(masks, filters, can_id):
+    for idx, filt in enumerate(filters):
+        mask = masks[0] if idx < N_FILTERS[0] else masks[1]
+        if (can_id ^ filt) & mask == 0:
+            return idx
+    return None
+
+
+def verify(masks, filters, filter_class, classes):
+    """Check masks and filters against every standard ID. Returns a dict
+    with the number of accepted IDs, wanted IDs rejected (should be 0),
+    wanted IDs hitting another class's filter (should be 0), unwanted IDs
+    accepted, and the false accept rate as a fraction of unwanted IDs"""
+    wanted = {}
+    for class_idx, ids in enumerate(classes):
+        for can_id in ids:
+            wanted[can_id] = class_idx
+
+    accepted = rejected = misrouted = false_accepts = 0
+    for can_id in range(ID_MASK + 1):
+        hit = filter_hit(masks, filters, can_id)
+        if hit is not None:
+            accepted += 1
+
+        if can_id in wanted:
+            if hit is None:
+                rejected += 1
+            elif filter_class[hit] != wanted[can_id]:
+                misrouted += 1
+        elif hit is not None:
+            false_accepts += 1
+
+    return {
+        "accepted": accepted,
+        "rejected": rejected,
+        "misrouted": misrouted,
+        "false_accepts": false_accepts,
+        "false_accept_rate": false_accepts / max(1, ID_MASK + 1 - len(wanted)),
+    }
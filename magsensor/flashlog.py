@@ -0,0 +1,268 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Strike log in flash
+#
+# Each strike is a 4 byte little endian record, the bell number in the
+# top byte and the strike time in ms from the first strike of the touch
+# in the low 24 bits, as read by util/remote.py. A touch starts with the
+# first strike after touch_gap_ms without any, and each touch is a new
+# file in the log directory, numbered after the last. When free space is
+# below reserve_bytes as a touch's first block is written, the oldest
+# touches are deleted.
+#
+# The index file holds a record per touch: file number, start (time.time()
+# seconds), duration in ms, strike count (held at 65535) and a mask of the
+# bells rung (bit n for bell n), so touches can be listed without opening
+# each file. The current touch's record is rewritten with each block
+# written.
+#
+# Records collect in one of two preallocated blocks. A full block is
+# written whole, and a part filled one after flush_ms, so a power cut
+# loses at most flush_ms of strikes. Flash writes stall the RP2040, so a
+# write waits until no strike is due for quiet_ms. Strikes in a block
+# that can't be written are counted in dropped.
+
+import asyncio
+import os
+import struct
+import time
+
+# Largest time in a record
+TIME_MASK = 0xFFFFFF
+
+INDEX_NAME = "index"
+INDEX_FORMAT = "<HIIHH"
+INDEX_SIZE = struct.calcsize(INDEX_FORMAT)
+
+
+# Touch file numbers in a log directory, oldest first
+def touch_numbers(directory):
+    return sorted(int(name) for name in os.listdir(directory) if name.isdigit())
+
+
+# Index records as (number, start, duration_ms, strikes, bell_mask) tuples
+def read_index(directory):
+    with open(directory + "/" + INDEX_NAME, "rb") as f:
+        data = f.read()
+
+    n = len(data) // INDEX_SIZE
+    return [struct.unpack_from(INDEX_FORMAT, data, idx * INDEX_SIZE) for idx in range(n)]
+
+
+class FlashLog:
+    # directory: where log files go
+    # block_records: records per block, a multiple of 128 fills whole 512 byte flash pages
+    # flush_ms: longest a record waits to be written
+    # quiet_ms: time clear of strikes needed for a write, more than a sector erase takes
+    # touch_gap_ms: time without strikes that ends a touch, more than flush_ms
+    # reserve_bytes: free space kept for a new touch, enough for a long one
+    def __init__(
+        self,
+        directory,
+        block_records=128,
+        flush_ms=5000,
+        quiet_ms=50,
+        touch_gap_ms=120000,
+        reserve_bytes=262144,
+    ):
+        self._directory = directory
+        self._blocks = [bytearray(4 * block_records), bytearray(4 * block_records)]
+        self._fill = 0
+        self._pos = 0
+        self._full = None
+        self._flush_ms = flush_ms
+        self._quiet_ms = quiet_ms
+        self._touch_gap_ms = touch_gap_ms
+        self._reserve_bytes = reserve_bytes
+        self._event = asyncio.Event()
+
+        # Current touch, numbered after the last one in flash
+        self.number = 0
+        self._next_number = self._last_touch() + 1
+        self._start = 0
+        self._start_ms = 0
+        self._last_ms = 0
+        self._strikes = 0
+        self._bell_mask = 0
+
+        # A new touch is waiting for the last one's part filled block to be handed over
+        self._touch_waiting = False
+
+        # Touch last written to flash
+        self._written = 0
+        self.dropped = 0
+
+    def _path(self, number):
+        return "{}/{:04d}".format(self._directory, number)
+
+    def _last_touch(self):
+        # Number of the newest touch in flash, creating the directory if there isn't one.
+        # Pruning only deletes older touches, so later numbers follow on without looking again
+        try:
+            numbers = touch_numbers(self._directory)
+        except OSError:
+            numbers = []
+            try:
+                os.mkdir(self._directory)
+            except OSError:
+                # Writes will fail too and count as dropped
+                pass
+        return numbers[-1] if numbers else 0
+
+    def _new_touch(self, strike_ticks_ms):
+        # Hand what is left of the last touch to the writer, add() checks there is room. No
+        # filesystem calls here, this runs in the strike path
+        if self._pos:
+            self._swap()
+            self._event.set()
+
+        self.number = self._next_number
+        self._next_number += 1
+        self._start = int(time.time())
+        self._start_ms = strike_ticks_ms
+        self._strikes = 0
+        self._bell_mask = 0
+
+    def _prune(self):
+        # Delete the oldest touches until there is room for a new one
+        numbers = touch_numbers(self._directory)
+        pruned = False
+        while numbers:
+            stat = os.statvfs(self._directory)
+            if stat[0] * stat[4] >= self._reserve_bytes:
+                break
+
+            os.remove(self._path(numbers.pop(0)))
+            pruned = True
+
+        if pruned:
+            try:
+                records = [r for r in read_index(self._directory) if r[0] in numbers]
+            except OSError:
+                return
+            with open(self._directory + "/" + INDEX_NAME, "wb") as f:
+                for record in records:
+                    f.write(struct.pack(INDEX_FORMAT, *record))
+
+    # Add a strike, without allocating except when a touch starts. Returns False, and counts
+    # it in dropped, if both blocks are waiting to be written
+    def add(self, bell, strike_ticks_ms):
+        if not self.number or time.ticks_diff(strike_ticks_ms, self._last_ms) > self._touch_gap_ms:
+            if self._pos and self._full is not None:
+                # The last touch's strikes can't go to the writer yet and mustn't end up in
+                # the new touch's file. Drop the strike as if both blocks were full
+                self._touch_waiting = True
+                self.dropped += 1
+                return False
+            self._new_touch(strike_ticks_ms)
+
+        block = self._blocks[self._fill]
+        if self._pos == len(block):
+            if self._full is not None:
+                self.dropped += 1
+                return False
+            self._swap()
+            block = self._blocks[self._fill]
+
+        t = time.ticks_diff(strike_ticks_ms, self._start_ms) & TIME_MASK
+        struct.pack_into("<I", block, self._pos, (bell << 24) | t)
+        self._pos += 4
+        self._last_ms = strike_ticks_ms
+        self._strikes += 1
+        self._bell_mask |= 1 << bell
+
+        if self._pos == len(block) and self._full is None:
+            self._swap()
+            self._event.set()
+        return True
+
+    def _swap(self):
+        # Hand the filled block to the writer, with its touch as it stands, and fill the other
+        self._full = (
+            self._fill,
+            self._pos,
+            self.number,
+            self._start,
+            time.ticks_diff(self._last_ms, self._start_ms),
+            min(self._strikes, 0xFFFF),
+            self._bell_mask & 0xFFFF,
+        )
+        self._fill ^= 1
+        self._pos = 0
+
+    def _write(self):
+        index, nbytes, number = self._full[:3]
+        if number != self._written:
+            self._prune()
+            self._written = number
+
+        with open(self._path(number), "ab") as f:
+            f.write(memoryview(self._blocks[index])[:nbytes])
+        self._write_index(self._full[2:])
+
+    def _write_index(self, touch):
+        # Rewrite the touch's record if it is the last, otherwise add one
+        record = struct.pack(INDEX_FORMAT, *touch)
+        path = self._directory + "/" + INDEX_NAME
+        try:
+            with open(path, "r+b") as f:
+                f.seek(-INDEX_SIZE, 2)
+                if struct.unpack_from("<H", f.read(INDEX_SIZE))[0] == touch[0]:
+                    f.seek(-INDEX_SIZE, 2)
+                f.write(record)
+        except OSError:
+            # No index yet
+            with open(path, "ab") as f:
+                f.write(record)
+
+    async def _quiet(self, strikes):
+        # Wait until no strike is due for quiet_ms
+        while True:
+            due_ms = strikes.due_in_ms()
+            if due_ms is None or due_ms > self._quiet_ms:
+                return
+            await asyncio.sleep_ms(max(due_ms, 0) + 1)
+
+    # Write blocks as they fill or flush_ms passes. Run as a task, never returns
+    async def run(self, strikes):
+        while True:
+            try:
+                await asyncio.wait_for_ms(self._event.wait(), self._flush_ms)
+            except asyncio.TimeoutError:
+                pass
+            self._event.clear()
+
+            # Flush a part filled block, unless a full one is already waiting
+            if self._full is None:
+                if not self._pos:
+                    continue
+                self._swap()
+
+            await self._quiet(strikes)
+            try:
+                self._write()
+            except OSError:
+                # Flash full or a filesystem fault. Lose the block, not the receiver
+                self.dropped += self._full[1] // 4
+            self._full = None
+
+            # The other block may have filled while this one waited, or be holding up a touch
+            if self._pos == len(self._blocks[self._fill]) or (self._pos and self._touch_waiting):
+                self._swap()
+                self._event.set()
+            self._touch_waiting = False
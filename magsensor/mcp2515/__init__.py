@@ -24,13 +24,15 @@ Implementation Notes
 * Adafruit's Bus Device library: https://github.com/adafruit/Adafruit_CircuitPython_BusDevice
 """
 
+import asyncio
 from collections import namedtuple
-from struct import unpack_from, pack_into
-from time import sleep
+from struct import pack_into
+from time import ticks_ms, ticks_us, ticks_diff
 from micropython import const
-from .spi_device import SPIDevice
+from .spi_device import SPIDevice, ProfilingSPIDevice
 from .canio import *
 from .timer import Timer
+from .timing import bit_timing
 
 try:
     from typing_extensions import Literal
@@ -57,6 +59,7 @@ _LOAD_TX0 = const(0x40)
 _LOAD_TX1 = const(0x42)
 _LOAD_TX2 = const(0x44)
 _READ_STATUS = const(0xA0)
+_RX_STATUS = const(0xB0)
 
 _SEND_TX0 = const(0x81)
 _SEND_TX1 = const(0x82)
@@ -117,6 +120,10 @@ _WAKIF = const(0x40)
 # Standard/Extended ID Buffers, Masks, Flags
 _TXB_EXIDE_M_16 = const(0x08)
 _TXB_TXREQ_M = const(0x08)  # TX request/completion bit
+_TXB_TXERR_M = const(0x10)
+_TXB_MLOA_M = const(0x20)
+_TXB_ABTF_M = const(0x40)
+_TXB_TXP_M = const(0x03)  # TX priority bits
 
 EXTID_TOP_11_WRITE_MASK = 0x1FFC0000
 EXTID_TOP_11_READ_MASK = 0xFFE00000
@@ -131,12 +138,19 @@ EXTID_FLAG_MASK = (
 
 # masks
 _MODE_MASK = const(0xE0)
+_CANCTRL_OSM = const(0x08)
 
 _RXB_RX_MASK = const(0x60)
 _RXB_BUKT_MASK = const((1 << 2))
 _RXB_RX_STDEXT = const(0x00)
 
 _STAT_RXIF_MASK = const(0x03)
+
+_RXSTAT_RXB0 = const(0x40)
+_RXSTAT_RXB1 = const(0x80)
+_RXSTAT_FILTER_MASK = const(0x07)
+_RXB0CTRL_FILHIT_MASK = const(0x01)
+_RXB1CTRL_FILHIT_MASK = const(0x07)
 _RTR_MASK = const(0x40)
 
 _STAT_TXIF_MASK = const(0xA8)
@@ -156,7 +170,23 @@ _EFLG = const(0x2D)
 
 ############ Misc Consts #########
 _SEND_TIMEOUT_MS = const(5)  # 500ms
+_RESET_TIMEOUT_MS = const(10)
+_MODE_TIMEOUT_MS = const(200)
 _MAX_CAN_MSG_LEN = 8  # ?!
+# Longest wait on a transmit interrupt before checking the buffer anyway, one-shot failures
+# don't interrupt
+_TX_INT_WAIT_MS = const(10)
+
+# Driver methods SPI traffic is counted against while profiling, see MCP2515.profile()
+_PROFILED = (
+    "initialize",
+    "load_filters",
+    "send",
+    "_read_from_rx_buffers",
+    "_get_bus_status",
+)
+_PROFILED_ASYNC = ("send_async", "monitor_health")
+
 # perhaps this will be stateful later?
 _TransmitBuffer = namedtuple(
     "_TransmitBuffer",
@@ -188,7 +218,7 @@ _BAUD_RATES = {
         80000: (0x03, 0xFF, 0x87),
         50000: (0x07, 0xFA, 0x87),
         40000: (0x07, 0xFF, 0x87),
-        33000: (0x09, 0xBE, 0x07),
+        33000: (0x09, 0xBE, 0x07),  # Baud rate is 33.333kbps!
         31250: (0x0F, 0xF1, 0x85),
         25000: (0x0F, 0xBA, 0x07),
         20000: (0x0F, 0xFF, 0x87),
@@ -197,24 +227,12 @@ _BAUD_RATES = {
         666000: (0x00, 0xA0, 0x04),
     },
     # 10MHz Crystal oscillator (used on the MIKROE "CAN SPI click"-board)
+    # Only the rates these settings reach, others are calculated, see util/bittiming.py
     10000000: {
         #        CNF1, CNF2, CNF3
         500000: (0x00, 0x92, 0x02),
         250000: (0x00, 0xB5, 0x05),
         200000: (0x00, 0xBF, 0x07),  # SP is 68%!
-        125000: (0x01, 0xA4, 0x04),  # SP is 68.75%!
-        100000: (0x01, 0xB5, 0x05),
-        95000: (0x05, 0x89, 0x01),  # SP is 71.43%, Baud rate is 95.238kbps!
-        83300: (0x02, 0xA4, 0x04),  # SP is 68.75%, Baud rate is 83.333kbps!
-        80000: (0x04, 0x92, 0x02),
-        50000: (0x03, 0xB5, 0x05),
-        40000: (0x04, 0xB5, 0x05),
-        33000: (0x05, 0xB5, 0x05),  # Baud rate is 33.333kbps!
-        31250: (0x07, 0xA4, 0x04),  # SP is 68.75%!
-        25000: (0x07, 0xB5, 0x05),
-        20000: (0x09, 0xB5, 0x05),
-        10000: (0x13, 0xB5, 0x05),
-        5000: (0x27, 0xB5, 0x05),
     },
     # 8MHz Crystal oscillator
     8000000: {
@@ -240,6 +258,41 @@ _BAUD_RATES = {
 }
 
 
+class RxOverflow:
+    """What to do with a received message when the unread queue is full"""
+
+    DROP_OLDEST = 0
+    """Discard the oldest unread message to make room for the new one"""
+
+    DROP_NEWEST = 1
+    """Discard the new message"""
+
+
+class SendResult:
+    """The outcome of `MCP2515.send_async`"""
+
+    QUEUED = 0
+    """The message was loaded into a transmit buffer, completion was not awaited"""
+
+    SENT = 1
+    """The message was transmitted"""
+
+    TIMEOUT = 2
+    """No transmit buffer became free, or the message was still pending without an error, when\
+    the timeout expired"""
+
+    ABORTED = 3
+    """Transmission was aborted, including by the driver when the send deadline passed"""
+
+    LOST_ARBITRATION = 4
+    """Transmission was abandoned after the message lost arbitration, or the timeout expired\
+    with the message still pending after losing arbitration"""
+
+    ERROR = 5
+    """Transmission was abandoned after a bus error, or the timeout expired with the message\
+    still pending after a bus error"""
+
+
 def _tx_buffer_status_decode(status_byte):
     out_str = "Status: "
     # when CAN_H is disconnected?: 0x18
@@ -266,18 +319,37 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
         :param ~digitalio.DigitalInOut cs_pin:  SPI bus enable pin
         :param int baudrate: The bit rate of the bus in Hz. All devices on\
             the bus must agree on this value. Defaults to 250000.
-        :param Literal crystal_freq: MCP2515 crystal frequency. Valid values are:\
-            16000000, 10000000 and 8000000. Defaults to 16000000 (16MHz).\
+        :param int crystal_freq: MCP2515 crystal frequency. Rates in the fixed table for\
+            16000000, 10000000 and 8000000 crystals use its settings, anything else is calculated.\
+            Defaults to 16000000 (16MHz).\
+        :param float sample_point: Sample point as a fraction of the bit. If given, the bit\
+            timing is calculated for it instead of taken from the fixed settings. Defaults to\
+            `None`.
         :param bool loopback: Receive only packets sent from this device, and send only to this\
         device. Requires that `silent` is also set to `True`, but only prevents transmission to\
         other devices. Otherwise the send/receive behavior is normal.
         :param bool silent: When `True` the controller does not transmit and all messages are\
         received, ignoring errors and filters. This mode can be used to “sniff” a CAN bus without\
         interfering. Defaults to `False`.
-        :param bool auto_restart: **Not supported by hardware. An `AttributeError` will be raised\
-        if `auto_restart` is set to `True`** If `True`, will restart communications after entering\
-        bus-off state. Defaults to `False`.
+        :param bool auto_restart: If `True`, ``monitor_health()`` will restart communications after\
+        entering bus-off state. Defaults to `False`.
         :param bool debug: If `True`, will enable printing debug information. Defaults to `False`.
+        :param ~machine.Pin int_pin: Optional input pin connected to the MCP2515 INT output. When\
+        given, the receive path only reads the controller once INT signals a frame and tasks can\
+        ``await`` new messages instead of polling. Defaults to `None`.
+        :param int poll_ms: Without an INT pin, how long a task awaiting a message, a free\
+        transmit buffer or the end of a transmission sleeps between polls of the controller.\
+        Frames are timestamped when read, so up to this late. Defaults to 0, poll on every\
+        scheduler pass.
+        :param bool fast_send: If `True`, ``send()`` loads each frame from a preallocated buffer in a\
+        single SPI transaction and does not allocate. Defaults to `False`.
+        :param int rx_queue_size: Capacity of the preallocated queue holding received messages\
+        until they are read, at least 2. Defaults to 8.
+        :param int rx_overflow: What to do with a received message when the queue is full, one of\
+        `RxOverflow.DROP_OLDEST` or `RxOverflow.DROP_NEWEST`. Dropped messages are counted in\
+        `dropped_message_count`. Defaults to `RxOverflow.DROP_OLDEST`.
+        :param bool one_shot: If `True`, the controller attempts each transmission once instead\
+        of retrying after lost arbitration or a bus error. Defaults to `False`.
         """
 
     def __init__(
@@ -286,40 +358,100 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
         cs_pin,
         *,
         baudrate: int = 250000,
-        crystal_freq: Literal[8000000, 10000000, 16000000] = 16000000,
+        crystal_freq: int = 16000000,
+        sample_point: float = None,
         loopback: bool = False,
         silent: bool = False,
         auto_restart: bool = False,
         debug: bool = False,
+        int_pin=None,
+        poll_ms: int = 0,
+        fast_send: bool = False,
+        rx_queue_size: int = 8,
+        rx_overflow: int = RxOverflow.DROP_OLDEST,
+        one_shot: bool = False,
     ):
 
         if loopback and not silent:
             raise AttributeError("Loopback mode requires silent to be set")
-        if auto_restart:
-            raise AttributeError("`auto-restart` is not supported by hardware")
+        # Draining reads both receive buffers at once, so needs room for two
+        if rx_queue_size < 2:
+            raise ValueError("rx_queue_size must be at least 2")
 
         self._auto_restart = auto_restart
         self._debug = debug
         self._bus_device_obj = SPIDevice(spi_bus, cs_pin)
         self._cs_pin = cs_pin
         self._id_buffer = bytearray(4)
-        self._unread_message_queue = []
         self._timer = Timer()
         self._tx_buffers = []
         self._rx0_overflow = False
         self._rx1_overflow = False
+        self._rx0_overflow_count = 0
+        self._rx1_overflow_count = 0
+        self._error_warning_count = 0
+        self._error_passive_count = 0
+        self._bus_off_count = 0
+        self._restart_count = 0
+        self._tec = 0
+        self._rec = 0
+        # Mask and filter register values, written again after a restart
+        self._id_registers = {}
         self._masks_in_use = []
         self._filters_in_use = [[], []]
         self._mode = None
         self._bus_state = BusState.ERROR_ACTIVE
         self._baudrate = baudrate
         self._crystal_freq = crystal_freq
+        self._sample_point = sample_point
         self._loopback = loopback
         self._silent = silent
+        self._int_pin = int_pin
+        self._poll_ms = poll_ms
+        self._rx_flag = None
+        self._tx_flag = None
+        self._tx_waiting = 0
+        self._irq_ticks_us = 0
+        self._irq_stamped = False
+        self._fast_send = fast_send
+        self._one_shot = one_shot
+
+        # Preallocated SPI buffers
+        self._status_cmd = bytes([_READ_STATUS, 0])
+        self._rx_status_cmd = bytes([_RX_STATUS, 0])
+        self._status_buf = bytearray(2)
+        self._reg_cmd = bytearray([_READ, 0, 0])
+        self._reg_buf = bytearray(3)
+        # WRITE command and address, TXBnCTRL, 4 ID bytes, DLC and up to 8 data bytes
+        self._tx_frame = bytearray(8 + _MAX_CAN_MSG_LEN)
+        tx_frame = memoryview(self._tx_frame)
+        self._tx_frame_views = [tx_frame[: 8 + n] for n in range(_MAX_CAN_MSG_LEN + 1)]
+        self._tx_frame[0] = _WRITE
+        # READ RX command followed by 4 ID bytes, DLC and 8 data bytes
+        self._rx_cmds = [
+            bytes([_READ_RX0]) + bytes(13),
+            bytes([_READ_RX1]) + bytes(13),
+        ]
+        self._rx_buf = bytearray(14)
+
+        # Unread frames are held in a ring buffer. Data frames are copied into the pool message
+        # belonging to their queue position so the queue never allocates
+        self._rx_pool = [Message(0, b"") for _ in range(rx_queue_size)]
+        self._rx_queue = list(self._rx_pool)
+        self._rx_head = 0
+        self._rx_count = 0
+        self._rx_overflow = rx_overflow
+        self._dropped_count = 0
 
         self._init_buffers()
         self.initialize()
 
+        if int_pin is not None:
+            self._rx_flag = asyncio.ThreadSafeFlag()
+            self._tx_flag = asyncio.ThreadSafeFlag()
+            # Hard IRQ so the timestamp isn't delayed by the scheduler
+            int_pin.irq(self._int_handler, trigger=int_pin.IRQ_FALLING, hard=True)
+
     def _init_buffers(self):
 
         self._tx_buffers = [
@@ -345,35 +477,31 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
                 SEND_CMD=_SEND_TX2,
             ),
         ]
+        self._send_cmds = [bytes([buf.SEND_CMD]) for buf in self._tx_buffers]
 
     def initialize(self):
         """Return the sensor to the default configuration"""
+        # leaves the controller in configuration mode
         self._reset()
-        # our mode set skips checking for sleep
-        self._set_mode(_MODE_CONFIG)
+        if self._one_shot:
+            self._mod_register(_CANCTRL, _CANCTRL_OSM, _CANCTRL_OSM)
 
-        self._set_baud_rate()
+        # CNF3, CNF2, CNF1 and CANINTE are consecutive registers. Interrupt on received
+        # messages for the INT pin
+        cnf1, cnf2, cnf3 = self._baud_rate_config()
+        self._write_registers(_CNF3, bytes([cnf3, cnf2, cnf1, _RX0IF | _RX1IF]))
 
         # intialize TX and RX registers
-        for idx in range(14):
-            self._set_register(_TXB0CTRL + idx, 0)
-            self._set_register(_TXB1CTRL + idx, 0)
-            self._set_register(_TXB2CTRL + idx, 0)
-
-        self._set_register(_RXB0CTRL, 0)
-        self._set_register(_RXB1CTRL, 0)
-
-        # # # interrupt mode
-        # TODO: WHAT IS THIS
-        self._set_register(_CANINTE, _RX0IF | _RX1IF)
-        sleep(0.010)
-        self._mod_register(
-            _RXB0CTRL,
-            _RXB_RX_MASK | _RXB_BUKT_MASK,
-            _RXB_RX_STDEXT | _RXB_BUKT_MASK,
-        )
+        zeros = bytes(14)
+        self._write_registers(_TXB0CTRL, zeros)
+        self._write_registers(_TXB1CTRL, zeros)
+        self._write_registers(_TXB2CTRL, zeros)
+        self._tx_priorities = [0, 0, 0]
+
+        # RXB0 rolls over into RXB1 when full
+        self._set_register(_RXB0CTRL, _RXB_RX_STDEXT | _RXB_BUKT_MASK)
+        self._set_register(_RXB1CTRL, _RXB_RX_STDEXT)
 
-        self._mod_register(_RXB1CTRL, _RXB_RX_MASK, _RXB_RX_STDEXT)
         if self.loopback:
             new_mode = _MODE_LOOPBACK
         elif self.silent:
@@ -383,20 +511,149 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
 
         self._set_mode(new_mode)
 
-    def send(self, message_obj):
+    def send(self, message_obj, priority=None):
         """Send a message on the bus with the given data and id. If the message could not be sent
-         due to a full fifo or a bus error condition, RuntimeError is raised.
+         due to a full fifo or a bus error condition, RuntimeError is raised. A free buffer that
+         would send it ahead of a pending message of the same priority counts as full.
 
         Args:
             message (canio.Message): The message to send. Must be a valid `canio.Message`
+            priority (int, optional): Transmit priority from 0 (lowest) to 3 (highest). When\
+                several transmit buffers are loaded the controller sends the highest priority\
+                first. Defaults to None, use the message's `priority`.
         """
+        if priority is None:
+            priority = message_obj.priority
+
+        if self._fast_send:
+            index = self._free_tx_buffer(priority)
+            if index is None:
+                raise RuntimeError("No transmit buffer available to send")
+
+            return self._write_message_fast(index, message_obj, priority)
 
         # TODO: Timeout
-        tx_buff = self._get_tx_buffer()  # info = addr.
+        tx_buff = self._get_tx_buffer(priority)  # info = addr.
         if tx_buff is None:
             raise RuntimeError("No transmit buffer available to send")
 
-        return self._write_message(tx_buff, message_obj)
+        return self._write_message(tx_buff, message_obj, priority)
+
+    async def send_async(
+        self, message_obj, priority=None, *, timeout_ms=None, wait_sent=False, deadline_ms=None
+    ):
+        """Send a message, waiting for a free transmit buffer instead of failing when all three
+        are busy.
+
+        Args:
+            message (canio.Message): The message to send
+            priority (int, optional): Transmit priority from 0 (lowest) to 3 (highest).\
+                Defaults to None, use the message's `priority`.
+            timeout_ms (int, optional): Maximum time to wait in milliseconds, for both a free\
+                buffer and, with `wait_sent`, transmission. Defaults to None, wait forever.
+            wait_sent (bool, optional): If True, also wait until the controller has finished with\
+                the message. Defaults to False.
+            deadline_ms (int, optional): Time in milliseconds after which the message is no\
+                longer worth sending. Implies `wait_sent` and replaces `timeout_ms`, but when the\
+                deadline passes a pending message is aborted to free its buffer instead of being\
+                left queued. Defaults to None, no deadline.
+
+        Returns:
+            int: One of the `SendResult` values
+        """
+        if priority is None:
+            priority = message_obj.priority
+        if deadline_ms is not None:
+            timeout_ms = deadline_ms
+            wait_sent = True
+        start = ticks_ms()
+
+        while True:
+            index = self._free_tx_buffer(priority)
+            if index is not None:
+                break
+
+            if timeout_ms is not None and ticks_diff(ticks_ms(), start) >= timeout_ms:
+                return SendResult.TIMEOUT
+            await asyncio.sleep_ms(self._poll_ms)
+
+        tx_buffer = self._tx_buffers[index]
+        if not wait_sent:
+            if self._fast_send:
+                self._write_message_fast(index, message_obj, priority)
+            else:
+                self._mod_register(_CANINTF, tx_buffer.INT_FLAG_MASK, 0)
+                self._write_message(tx_buffer, message_obj, priority)
+            return SendResult.QUEUED
+
+        # With an INT pin, sleep until the buffer's transmit interrupt rather than poll. The
+        # flag is cleared before loading so a stale one can't wake the wait
+        mask = tx_buffer.INT_FLAG_MASK
+        use_int = self._tx_flag is not None
+        if use_int:
+            self._tx_waiting += 1
+            self._mod_register(_CANINTF, mask, 0)
+            self._mod_register(_CANINTE, mask, mask)
+        elif not self._fast_send:
+            self._mod_register(_CANINTF, mask, 0)
+
+        try:
+            if self._fast_send:
+                self._write_message_fast(index, message_obj, priority)
+            else:
+                self._write_message(tx_buffer, message_obj, priority)
+
+            aborted = False
+            while True:
+                ctrl = self._read_register_fast(tx_buffer.CTRL_REG)
+                if not ctrl & _TXB_TXREQ_M:
+                    break
+
+                elapsed = ticks_diff(ticks_ms(), start)
+                if timeout_ms is not None and elapsed >= timeout_ms:
+                    if deadline_ms is None:
+                        # Left queued for the controller to retry, report why it hasn't gone
+                        if ctrl & _TXB_MLOA_M:
+                            return SendResult.LOST_ARBITRATION
+                        if ctrl & _TXB_TXERR_M:
+                            return SendResult.ERROR
+                        return SendResult.TIMEOUT
+                    if not aborted:
+                        # Clearing TXREQ aborts the message unless it is already being
+                        # transmitted, keep waiting until the controller releases the buffer
+                        self._mod_register(tx_buffer.CTRL_REG, _TXB_TXREQ_M, 0)
+                        aborted = True
+
+                if use_int:
+                    # An abort doesn't interrupt either, check again soon
+                    wait_ms = 1 if aborted else _TX_INT_WAIT_MS
+                    if timeout_ms is not None and not aborted:
+                        wait_ms = min(wait_ms, timeout_ms - elapsed)
+                    try:
+                        await asyncio.wait_for_ms(self._tx_flag.wait(), wait_ms)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await asyncio.sleep_ms(self._poll_ms)
+        finally:
+            if use_int:
+                # TXnIF can stay set, it no longer drives INT and is cleared before the next wait
+                self._mod_register(_CANINTE, mask, 0)
+                self._tx_waiting -= 1
+
+        self._dbg(_tx_buffer_status_decode(ctrl))
+        # A one-shot failure may only be flagged by MLOA or TXERR
+        failed = ctrl & _TXB_ABTF_M or (self._one_shot and ctrl & (_TXB_MLOA_M | _TXB_TXERR_M))
+        if failed:
+            if aborted:
+                return SendResult.ABORTED
+            if ctrl & _TXB_MLOA_M:
+                return SendResult.LOST_ARBITRATION
+            if ctrl & _TXB_TXERR_M:
+                return SendResult.ERROR
+            return SendResult.ABORTED
+
+        return SendResult.SENT
 
     @property
     def unread_message_count(self):
@@ -405,9 +662,34 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
         Returns:
             int: The unread message count
         """
-        self._read_from_rx_buffers()
+        # INT is active low, so a high level means there is nothing to fetch
+        if self._int_pin is None or not self._int_pin.value():
+            self._read_from_rx_buffers()
+
+        return self._rx_count
+
+    async def wait_for_message(self):
+        """Wait until at least one message is available to `read_message`.
 
-        return len(self._unread_message_queue)
+        With an INT pin the task sleeps until the controller raises an interrupt, otherwise
+        the controller is polled every `poll_ms`."""
+        while self._rx_count == 0:
+            if self._int_pin is not None and self._int_pin.value():
+                await self._rx_flag.wait()
+            else:
+                self._read_from_rx_buffers()
+                if self._rx_count == 0:
+                    await asyncio.sleep_ms(self._poll_ms)
+
+    def _int_handler(self, _pin):
+        # Record when the frame arrived, before any task gets to read it. While a send is
+        # awaited the interrupt may be its transmit one, so frames are stamped when read
+        if self._tx_waiting:
+            self._tx_flag.set()
+        else:
+            self._irq_ticks_us = ticks_us()
+            self._irq_stamped = True
+        self._rx_flag.set()
 
     def read_message(self):
         """Read the next available message
@@ -418,51 +700,191 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
         if self.unread_message_count == 0:
             return None
 
-        return self._unread_message_queue.pop(0)
+        return self._copy_frame(self._pop_frame())
 
-    def _read_rx_buffer(self, read_command):
+    def read_message_into(self, message_obj):
+        """Read the next available message into an existing message without allocating
+
+        Args:
+            message_obj (canio.Message): The message to overwrite
+
+        Returns:
+            `message_obj`, a `canio.RemoteTransmissionRequest` if the next frame is a remote\
+            frame, or None if no message is available
+        """
+        if self.unread_message_count == 0:
+            return None
+
+        frame_obj = self._pop_frame()
+        if isinstance(frame_obj, RemoteTransmissionRequest):
+            return frame_obj
+
+        self._load_frame_into(frame_obj, message_obj)
+        return message_obj
+
+    def read_messages(self, max_n=None):
+        """Read every frame waiting in the controller and return up to `max_n` messages, oldest\
+        first. Frames left over stay queued for the next read.
+
+        Args:
+            max_n (int, optional): Maximum number of messages to return. Defaults to None, all\
+                of them.
+
+        Returns:
+            list: `canio.Message` and `canio.RemoteTransmissionRequest` objects, possibly empty
+        """
+        self._drain_rx_buffers()
+
+        count = self._rx_count if max_n is None else min(max_n, self._rx_count)
+        return [self._copy_frame(self._pop_frame()) for _ in range(count)]
+
+    def read_messages_into(self, messages):
+        """Read every frame waiting in the controller into a list of existing messages without\
+        allocating, oldest first. Remote frames are discarded.
+
+        Args:
+            messages (list): `canio.Message` objects to overwrite
+
+        Returns:
+            int: The number of messages filled, from the start of `messages`
+        """
+        self._drain_rx_buffers()
+
+        count = 0
+        while count < len(messages) and self._rx_count:
+            frame_obj = self._pop_frame()
+            if isinstance(frame_obj, RemoteTransmissionRequest):
+                continue
+
+            self._load_frame_into(frame_obj, messages[count])
+            count += 1
+
+        return count
+
+    def _copy_frame(self, frame_obj):
+        if isinstance(frame_obj, RemoteTransmissionRequest):
+            return frame_obj
+
+        # Pool slots are reused, so hand out a copy, the constructor copies the data
+        message_obj = Message(frame_obj.id, frame_obj.data, extended=frame_obj.extended)
+        message_obj.filter_index = frame_obj.filter_index
+        message_obj.buffer_index = frame_obj.buffer_index
+        message_obj.timestamp = frame_obj.timestamp
+        return message_obj
+
+    @staticmethod
+    def _load_frame_into(frame_obj, message_obj):
+        data = frame_obj.data
+        message_obj._load(frame_obj.id, frame_obj.extended, data, 0, len(data))
+        message_obj.filter_index = frame_obj.filter_index
+        message_obj.buffer_index = frame_obj.buffer_index
+        message_obj.timestamp = frame_obj.timestamp
+
+    def _drain_rx_buffers(self):
+        # Repeat until RX STATUS shows both buffers empty, collecting frames that arrive during
+        # the drain. Stop while the queue still has room for a full pass rather than drop frames
+        if self._int_pin is not None and self._int_pin.value():
+            return
+
+        while self._rx_count + 2 <= len(self._rx_queue):
+            if not self._read_from_rx_buffers():
+                return
+
+    @property
+    def dropped_message_count(self):
+        """The number of received messages discarded because the unread queue was full"""
+        return self._dropped_count
+
+    def _pop_frame(self):
+        frame_obj = self._rx_queue[self._rx_head]
+        self._rx_head = (self._rx_head + 1) % len(self._rx_queue)
+        self._rx_count -= 1
+        return frame_obj
+
+    def _read_rx_buffer(self, rx_index, filter_index, timestamp):
         # read from buffer
+        buffer = self._rx_buf
         with self._bus_device_obj as spi:
-            spi.write(bytes([read_command]))
-            buffer = spi.read(13)  # 4 ID, DLC, and 8 data
+            spi.write_readinto(self._rx_cmds[rx_index], buffer)
+
+        queue_size = len(self._rx_queue)
+        if self._rx_count == queue_size:
+            self._dropped_count += 1
+            if self._rx_overflow == RxOverflow.DROP_NEWEST:
+                return
+            self._pop_frame()
 
         ######### Unpack IDs/ set Extended #######
+        # buffer[0] is the command echo, followed by SIDH, SIDL, EID8, EID0
+        sender_id = (buffer[1] << 3) | (buffer[2] >> 5)
+        extended = (buffer[2] & _TXB_EXIDE_M_16) > 0
+        if extended:
+            sender_id = (
+                (sender_id << 18) | ((buffer[2] & 0x03) << 16) | (buffer[3] << 8) | buffer[4]
+            )
 
-        raw_ids = unpack_from(">I", buffer)[0]
-        extended, sender_id = self._unload_ids(raw_ids)
         ############# Length/RTR Size #########
-        dlc = buffer[4]
+        dlc = buffer[5]
         # length is max 8
         message_length = min(8, dlc & 0xF)
 
+        tail = (self._rx_head + self._rx_count) % queue_size
         if (dlc & _RTR_MASK) > 0:
             frame_obj = RemoteTransmissionRequest(
                 sender_id, message_length, extended=extended
             )
         else:
-            frame_obj = Message(
-                sender_id,
-                data=bytes(buffer[5 : 5 + message_length]),
-                extended=extended,
-            )
-        self._unread_message_queue.append(frame_obj)
+            frame_obj = self._rx_pool[tail]
+            frame_obj._load(sender_id, extended, buffer, 6, message_length)
+        frame_obj.filter_index = filter_index
+        frame_obj.buffer_index = rx_index
+        frame_obj.timestamp = timestamp
+        self._rx_queue[tail] = frame_obj
+        self._rx_count += 1
 
     def _read_from_rx_buffers(self):
-        """Read the next available message into the given `bytearray`
-
-        Args:
-            msg_buffer (bytearray): The buffer to load the message into
-        """
-        status = self._read_status()
-
-        # TODO: read and store all available messages
-        if status & 0b1:
-            self._read_rx_buffer(_READ_RX0)
+        """Read any frames waiting in the receive buffers, RXB0 first, recording the buffer
+        and the acceptance filter that matched each one. Returns True if a frame was read"""
+        # RX STATUS gives the full buffers and the filter hit in a single byte. Filter values
+        # 0-1 describe a frame in RXB0 and 2-7 a frame in RXB1. If both buffers are full and the
+        # filter describes the other buffer, fall back to the FILHIT bits in RXBnCTRL
+        #
+        # Frames are timestamped with the time of the last INT falling edge, which only
+        # belongs to the first frame read after it, otherwise with the time of this read
+        timestamp = ticks_us()
+        status = self._rx_status()
+        if not status & (_RXSTAT_RXB0 | _RXSTAT_RXB1):
+            return False
+
+        if self._irq_stamped:
+            self._irq_stamped = False
+            irq_timestamp = self._irq_ticks_us
+        else:
+            irq_timestamp = timestamp
+
+        if status & _RXSTAT_RXB0:
+            filter_index = status & _RXSTAT_FILTER_MASK
+            if filter_index > 1:
+                filter_index = self._read_register(_RXB0CTRL) & _RXB0CTRL_FILHIT_MASK
+            self._read_rx_buffer(0, filter_index, irq_timestamp)
+            irq_timestamp = timestamp
+
+            # A frame arriving while RXB0 was read rolls over into RXB1. Read it now, it is
+            # older than anything RXB0 takes before the next pass
+            status = self._rx_status()
+
+        if status & _RXSTAT_RXB1:
+            filter_index = status & _RXSTAT_FILTER_MASK
+            if filter_index < 2:
+                filter_index = self._read_register(_RXB1CTRL) & _RXB1CTRL_FILHIT_MASK
+            elif filter_index > 5:
+                # RXF0 or RXF1 match rolled over into RXB1
+                filter_index -= 6
+            self._read_rx_buffer(1, filter_index, irq_timestamp)
 
-        if status & 0b10:
-            self._read_rx_buffer(_READ_RX1)
+        return True
 
-    def _write_message(self, tx_buffer, message_obj):
+    def _write_message(self, tx_buffer, message_obj, priority=0):
 
         if tx_buffer is None:
             raise RuntimeError("No transmit buffer available to send")
@@ -499,11 +921,65 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
                 spi.write(message_obj.data)
 
         # send the frame based on the current buffers
-        self._start_transmit(tx_buffer)
+        self._start_transmit(tx_buffer, priority)
         return True
 
-    # TODO: Priority
-    def _start_transmit(self, tx_buffer):
+    def _free_tx_buffer(self, priority):
+        """Index of a free transmit buffer for a message of `priority`, or None. Between buffers
+        of equal priority the controller sends the highest numbered first, so a buffer above one
+        still pending at the same priority would jump the queue. The highest free buffer below
+        any such is used, which keeps messages of the same priority in order"""
+        status = self._read_status()
+        priority &= _TXB_TXP_M
+        index = None
+        for idx in range(3):
+            # Pending bits are 0x04, 0x10 and 0x40 for TXB0-2
+            if status & (_STAT_TX0_PENDING << (2 * idx)):
+                if self._tx_priorities[idx] == priority:
+                    break
+            else:
+                index = idx
+        return index
+
+    def _write_message_fast(self, index, message_obj, priority=0):
+        """Send without allocating: TXBnCTRL (for the priority), ID, DLC and data are written in
+        a single sequential register write and the frame started with RTS"""
+        frame = self._tx_frame
+        frame[1] = self._tx_buffers[index].CTRL_REG
+        frame[2] = priority & _TXB_TXP_M
+        self._pack_id_into(frame, 3, message_obj.id, message_obj.extended)
+
+        if isinstance(message_obj, RemoteTransmissionRequest):
+            dlc = message_obj.length
+            if dlc > _MAX_CAN_MSG_LEN:
+                raise AttributeError("Message/RTR length must be <=%d" % _MAX_CAN_MSG_LEN)
+            frame[7] = dlc | _RTR_MASK
+            length = 0
+        else:
+            data = message_obj.data
+            dlc = len(data)
+            if dlc > _MAX_CAN_MSG_LEN:
+                raise AttributeError("Message/RTR length must be <=%d" % _MAX_CAN_MSG_LEN)
+            frame[7] = dlc
+            for idx in range(dlc):
+                frame[8 + idx] = data[idx]
+            length = dlc
+        self._tx_priorities[index] = priority & _TXB_TXP_M
+
+        with self._bus_device_obj as spi:
+            spi.write(self._tx_frame_views[length])
+
+        with self._bus_device_obj as spi:
+            spi.write(self._send_cmds[index])
+        return True
+
+    def _start_transmit(self, tx_buffer, priority=0):
+        index = self._tx_buffers.index(tx_buffer)
+        priority &= _TXB_TXP_M
+        if priority != self._tx_priorities[index]:
+            self._mod_register(tx_buffer.CTRL_REG, _TXB_TXP_M, priority)
+            self._tx_priorities[index] = priority
+
         with self._bus_device_obj as spi:
             spi.write(bytes([tx_buffer.SEND_CMD]))
 
@@ -515,24 +991,6 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
         mask_reg_addr = MASKS[mask_index]
         self._write_id_to_register(mask_reg_addr, mask, extended)
 
-    @staticmethod
-    def _unload_ids(raw_ids):
-        """In=> 32-bit int packed with (StdID or ExTID top11  + bot18)+ extid bit
-        out=> id, extended flag"""
-        extended = (raw_ids & _TXB_EXIDE_M_16 << 16) > 0
-        # std id field is most significant 11 bits of 4 bytes of id registers
-        top_chunk = raw_ids & EXTID_TOP_11_READ_MASK
-        if extended:
-            # get bottom 18
-            bottom_chunk = raw_ids & EXTID_BOTTOM_18_MASK
-            # shift the top chunk back down 3 to start/end at bit 28=29th
-            top_chunk >>= 3
-            sender_id = top_chunk | bottom_chunk
-        else:
-            # shift down the  3 [res+extid+res]+18 extid bits
-            sender_id = top_chunk >> (18 + 3)
-        return (extended, sender_id)
-
     def _load_id_buffer(self, can_id, extended=False):
         self._id_buffer[0] = 0
         self._id_buffer[1] = 0
@@ -567,9 +1025,27 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
         # )
         pack_into(">I", self._id_buffer, 0, final_id)
 
+    @staticmethod
+    def _pack_id_into(buffer, offset, can_id, extended=False):
+        """Write the SIDH, SIDL, EID8 and EID0 register values for an ID into `buffer`.
+        Works a byte at a time so that no long integers are created"""
+        if extended:
+            buffer[offset] = (can_id >> 21) & 0xFF
+            buffer[offset + 1] = (
+                ((can_id >> 13) & 0xE0) | _TXB_EXIDE_M_16 | ((can_id >> 16) & 0x03)
+            )
+            buffer[offset + 2] = (can_id >> 8) & 0xFF
+            buffer[offset + 3] = can_id & 0xFF
+        else:
+            buffer[offset] = (can_id >> 3) & 0xFF
+            buffer[offset + 1] = (can_id & 0x07) << 5
+            buffer[offset + 2] = 0
+            buffer[offset + 3] = 0
+
     def _write_id_to_register(self, register, can_id, extended=False):
         # load register in to ID buffer
 
+        self._id_registers[register] = (can_id, extended)
         current_mode = self._mode
         self._set_mode(_MODE_CONFIG)
         # set the mask in the ID buffer
@@ -600,57 +1076,52 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
             bool(status & _STAT_TX2_PENDING),
         )
 
-    def _get_tx_buffer(self):
-        """Get the address of the next available tx buffer and unset
+    def _get_tx_buffer(self, priority=0):
+        """Get the next available tx buffer for `priority`, see `_free_tx_buffer`, and unset
         its interrupt bit in _CANINTF"""
-        # check all buffers by looking for match on
-        txs_busy = self._tx_buffers_in_use
-        if all(txs_busy):
+        buffer_index = self._free_tx_buffer(priority)
+        if buffer_index is None:
             self._dbg("none available!")
             return None
-        buffer_index = txs_busy.index(False)  # => self._tx_buffers
         tx_buffer = self._tx_buffers[buffer_index]
 
         self._mod_register(_CANINTF, tx_buffer.INT_FLAG_MASK, 0)
         return tx_buffer
 
-    def _set_baud_rate(self):
-        # ******* set baud rate ***********
-        if self._crystal_freq not in _BAUD_RATES:
-            raise ValueError(
-                f"Incorrect crystal frequency - must be one of: {tuple(_BAUD_RATES.keys())}"
-            )
-
-        cnf1, cnf2, cnf3 = _BAUD_RATES[self._crystal_freq][self.baudrate]
+    def _baud_rate_config(self):
+        # ******* get baud rate register values ***********
+        # Keep the fixed settings unless a sample point was asked for, raises ValueError if
+        # the rate can't be reached
+        if self._sample_point is None:
+            rates = _BAUD_RATES.get(self._crystal_freq, {})
+            if self._baudrate in rates:
+                return rates[self._baudrate]
 
-        self._set_register(_CNF1, cnf1)
-        self._set_register(_CNF2, cnf2)
-        self._set_register(_CNF3, cnf3)
-        sleep(0.010)
+        return bit_timing(self._crystal_freq, self._baudrate, self._sample_point)
 
     def _reset(self):
         with self._bus_device_obj as spi:
             spi.write(bytes([_RESET]))
-        sleep(0.010)
+
+        # The controller comes out of reset in configuration mode once its oscillator
+        # has started, poll for that rather than waiting a fixed time
+        self._timer.rewind_to(_RESET_TIMEOUT_MS)
+        while not self._timer.expired:
+            if (self._read_register(_CANSTAT) & _MODE_MASK) == _MODE_CONFIG:
+                self._mode = _MODE_CONFIG
+                return
+
+        raise RuntimeError("Timeout resetting controller")
 
     def _set_mode(self, mode):
         stat_reg = self._read_register(_CANSTAT)
         current_mode = stat_reg & _MODE_MASK
 
         if current_mode == mode:
+            self._mode = mode
             return
-        self._timer.rewind_to(5000)
-        while not self._timer.expired:
-
-            new_mode_set = self._request_new_mode(mode)
-            if new_mode_set:
-                self._mode = mode
-                return
 
-        raise RuntimeError("Unable to change mode")
-
-    def _request_new_mode(self, mode):
-        self._timer.rewind_to(200)
+        self._timer.rewind_to(_MODE_TIMEOUT_MS)
         while not self._timer.expired:
             # Request new mode
             # This is inside the loop as sometimes requesting the new mode once doesn't work
@@ -659,9 +1130,10 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
 
             status = self._read_register(_CANSTAT)
             if (status & _MODE_MASK) == mode:
-                return True
+                self._mode = mode
+                return
 
-        raise RuntimeError("Timeout setting Mode")
+        raise RuntimeError("Unable to change mode")
 
     def _mod_register(self, register_addr, mask, new_value):
         """There appears to be an interface on the MCP2515 that allows for
@@ -676,17 +1148,45 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
 
         return data[0]
 
+    def _read_register_fast(self, register_addr):
+        """Read one register without allocating"""
+        cmd = self._reg_cmd
+        cmd[1] = register_addr
+        with self._bus_device_obj as spi:
+            spi.write_readinto(cmd, self._reg_buf)
+
+        return self._reg_buf[2]
+
+    def _read_registers(self, start_addr, count):
+        """Read consecutive registers in one transaction"""
+        with self._bus_device_obj as spi:
+            spi.write(bytes([_READ, start_addr]))
+            data = spi.read(count)
+
+        return data
+
     def _read_status(self):
         with self._bus_device_obj as spi:
-            spi.write(bytes([_READ_STATUS]))
-            data = spi.read(1)
+            spi.write_readinto(self._status_cmd, self._status_buf)
 
-        return data[0]
+        return self._status_buf[1]
+
+    def _rx_status(self):
+        with self._bus_device_obj as spi:
+            spi.write_readinto(self._rx_status_cmd, self._status_buf)
+
+        return self._status_buf[1]
 
     def _set_register(self, register_addr, register_value):
         with self._bus_device_obj as spi:
             spi.write(bytes([_WRITE, register_addr, register_value]))
 
+    def _write_registers(self, start_addr, values):
+        """Write consecutive registers in one transaction"""
+        with self._bus_device_obj as spi:
+            spi.write(bytes([_WRITE, start_addr]))
+            spi.write(values)
+
     def _get_bus_status(self):
         """Get the status flags that report the state of the bus"""
         bus_flags = self._read_register(_EFLG)
@@ -705,19 +1205,94 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
             self._rx0_overflow,
             self._rx1_overflow,
         ) = flags
-        if self._rx0_overflow or self._rx0_overflow:
+        if self._rx0_overflow:
+            self._rx0_overflow_count += 1
+        if self._rx1_overflow:
+            self._rx1_overflow_count += 1
+        if self._rx0_overflow or self._rx1_overflow:
             self._mod_register(
                 _EFLG, 0xC0, 0
             )  # clear overflow bits now that we've recorded them
 
         if buss_off:
-            self._bus_state = BusState.BUS_OFF
+            bus_state = BusState.BUS_OFF
         elif tx_error_passive or rx_error_passive:
-            self._bus_state = BusState.ERROR_PASSIVE
+            bus_state = BusState.ERROR_PASSIVE
         elif error_warn:
-            self._bus_state = BusState.ERROR_WARNING
+            bus_state = BusState.ERROR_WARNING
         else:
-            self._bus_state = BusState.ERROR_ACTIVE
+            bus_state = BusState.ERROR_ACTIVE
+
+        # Count entries into each of the error states
+        if bus_state != self._bus_state:
+            if bus_state == BusState.ERROR_WARNING:
+                self._error_warning_count += 1
+            elif bus_state == BusState.ERROR_PASSIVE:
+                self._error_passive_count += 1
+            elif bus_state == BusState.BUS_OFF:
+                self._bus_off_count += 1
+        self._bus_state = bus_state
+
+    async def monitor_health(self, period_ms=100, max_backoff_ms=5000, stable_periods=10):
+        """Sample the error counters and flags every `period_ms` milliseconds, accumulating\
+        receive overflow and bus state counts. With `auto_restart` set, restart the controller\
+        from bus-off, doubling the wait before each further restart up to `max_backoff_ms`.\
+        The wait only drops back to `period_ms` once the bus has stayed error active for\
+        `stable_periods` samples in a row. A restart that fails is retried with the same\
+        backoff. Run this as a task, it never returns."""
+        backoff_ms = period_ms
+        healthy = 0
+        restart_failed = False
+        while True:
+            self._tec, self._rec = self._read_registers(_TEC, 2)
+            self._get_bus_status()
+
+            if self._auto_restart and (restart_failed or self._bus_state == BusState.BUS_OFF):
+                await asyncio.sleep_ms(backoff_ms)
+                self._dbg("Restarting from bus-off")
+                try:
+                    self.restart()
+                except RuntimeError as exc:
+                    # The controller didn't come out of reset or change mode, the counters
+                    # can't be trusted until a restart succeeds
+                    self._dbg("Restart failed:", exc)
+                    restart_failed = True
+                else:
+                    restart_failed = False
+                    self._restart_count += 1
+                backoff_ms = min(2 * backoff_ms, max_backoff_ms)
+                healthy = 0
+                continue
+
+            # A restart clears the error counters, so the bus looks healthy straight after
+            # one. Keep the backoff until it has stayed that way
+            if self._bus_state == BusState.ERROR_ACTIVE:
+                healthy += 1
+                if healthy >= stable_periods:
+                    backoff_ms = period_ms
+            else:
+                healthy = 0
+            await asyncio.sleep_ms(period_ms)
+
+    def health(self):
+        """Bus health counters accumulated by ``monitor_health()``
+
+        Returns:
+            dict: The most recently sampled bus state and error counters, and counts of\
+            overflow events, error state entries, restarts and dropped messages
+        """
+        return {
+            "state": self._bus_state,
+            "tec": self._tec,
+            "rec": self._rec,
+            "rx0_overflows": self._rx0_overflow_count,
+            "rx1_overflows": self._rx1_overflow_count,
+            "error_warnings": self._error_warning_count,
+            "error_passives": self._error_passive_count,
+            "bus_offs": self._bus_off_count,
+            "restarts": self._restart_count,
+            "dropped": self._dropped_count,
+        }
 
     def _create_mask(self, match):
         mask = match.mask
@@ -766,6 +1341,7 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
                 self._set_register(filter_reg, 0)
         self._masks_in_use = []
         self._filters_in_use = [[], []]
+        self._id_registers = {}
 
     ######## CANIO API METHODS #############
     @property
@@ -789,18 +1365,33 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
 
     @property
     def error_warning_state_count(self):
-        """Not supported by hardware. Raises an `AttributeError` if called"""
-        raise AttributeError("`error_warning_state_count` not supported by hardware")
+        """The number of times the controller has entered the warning state (read-only). Only\
+        counted when the bus state is read, see ``monitor_health()``"""
+        return self._error_warning_count
 
     @property
     def error_passive_state_count(self):
-        """Not supported by hardware. Raises an `AttributeError` if called"""
-        raise AttributeError("`error_passive_state_count` not supported by hardware")
+        """The number of times the controller has entered the error passive state (read-only).\
+        Only counted when the bus state is read, see ``monitor_health()``"""
+        return self._error_passive_count
 
     @property
     def bus_off_state_count(self):
-        """Not supported by hardware. Raises an `AttributeError` if called"""
-        raise AttributeError("`bus_off_state_count` not supported by hardware")
+        """The number of times the controller has entered the bus off state (read-only). Only\
+        counted when the bus state is read, see ``monitor_health()``"""
+        return self._bus_off_count
+
+    @property
+    def rx0_overflow_count(self):
+        """The number of times a message was lost because RXB0 was full (read-only). Only\
+        counted when the bus state is read, see ``monitor_health()``"""
+        return self._rx0_overflow_count
+
+    @property
+    def rx1_overflow_count(self):
+        """The number of times a message was lost because RXB1 was full (read-only). Only\
+        counted when the bus state is read, see ``monitor_health()``"""
+        return self._rx1_overflow_count
 
     @property
     def state(self):  # State
@@ -819,8 +1410,21 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
         return self._silent
 
     def restart(self):
-        """If the device is in the bus off state, restart it."""
+        """If the device is in the bus off state, restart it. Masks and filters set by\
+        ``listen()`` or ``load_filters()`` are restored."""
         self.initialize()
+        if not self._id_registers:
+            return
+
+        # The reset cleared the mask and filter registers, write them all in one config spell
+        current_mode = self._mode
+        self._set_mode(_MODE_CONFIG)
+        for register, (can_id, extended) in self._id_registers.items():
+            self._load_id_buffer(can_id, extended)
+            with self._bus_device_obj as spi:
+                spi.write(bytes([_WRITE, register]))
+                spi.write(self._id_buffer)
+        self._set_mode(current_mode)
 
     def listen(self, matches=None, *, timeout=1000):
         """Start receiving messages that match any one of the filters.
@@ -886,6 +1490,39 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
 
         return Listener(self, timeout)
 
+    def profile(self, enable=True):
+        """Switch SPI profiling on or off. While on, chip select cycles, bytes and time are\
+        counted against the driver method making each transfer (``send``,\
+        ``_read_from_rx_buffers``, ``_get_bus_status``, ...). Profiling adds time to every\
+        transfer.
+
+        Args:
+            enable (bool, optional): True to start profiling, False to stop. Defaults to True.
+
+        Returns:
+            `ProfilingSPIDevice`: The counts, print them with ``report()``. When stopping, the\
+            final counts, or None if profiling was off.
+        """
+        device = self._bus_device_obj
+        profiling = isinstance(device, ProfilingSPIDevice)
+        if enable and not profiling:
+            device = ProfilingSPIDevice(device.spi_bus, self._cs_pin)
+            # Instance attributes take precedence over the methods
+            for name in _PROFILED:
+                setattr(self, name, device.wrap(getattr(self, name), name))
+            for name in _PROFILED_ASYNC:
+                setattr(self, name, device.wrap_async(getattr(self, name), name))
+            self._bus_device_obj = device
+
+        elif not enable:
+            if not profiling:
+                return None
+            for name in _PROFILED + _PROFILED_ASYNC:
+                delattr(self, name)
+            self._bus_device_obj = SPIDevice(device.spi_bus, self._cs_pin)
+
+        return device
+
     def deinit(self):
         """Deinitialize this object, freeing its hardware resources"""
         self._cs_pin.deinit()
@@ -900,12 +1537,32 @@ class MCP2515:  # pylint:disable=too-many-instance-attributes
         self.deinit()
 
     def load_filters(self, masks, filters):
-        for addr, mask in zip(MASKS, masks):
-            self._write_id_to_register(addr, mask, False)
+        """Load mask and filter registers directly, for standard IDs.
+
+        Args:
+            masks ([int]): Up to 2 values for RXM0 and RXM1
+            filters ([int]): Up to 6 values for RXF0 to RXF5, RXF0-1 are used with RXM0 and\
+                RXF2-5 with RXM1
+        """
+        current_mode = self._mode
+        self._set_mode(_MODE_CONFIG)
 
-        filter_addresses = [x for sub in FILTERS for x in sub]
-        for addr, filt in zip(filter_addresses, filters):
-            self._write_id_to_register(addr, filt, False)
+        # RXM0-1, RXF0-2 and RXF3-5 are each blocks of consecutive 4 byte ID registers
+        masks = masks[: len(MASKS)]
+        filters = filters[:6]
+        for start_addr, ids in (
+            (_RXM0SIDH, masks),
+            (_RXF0SIDH, filters[:3]),
+            (_RXF3SIDH, filters[3:]),
+        ):
+            if ids:
+                values = bytearray(4 * len(ids))
+                for idx, can_id in enumerate(ids):
+                    self._pack_id_into(values, 4 * idx, can_id, False)
+                    self._id_registers[start_addr + 4 * idx] = (can_id, False)
+                self._write_registers(start_addr, values)
+
+        self._set_mode(current_mode)
 
     ##################### End canio API ################
 
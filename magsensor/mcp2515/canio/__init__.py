@@ -3,6 +3,7 @@
 # SPDX-License-Identifier: MIT
 """Python implementation of the CircuitPython core `canio` API"""
 # pylint:disable=too-few-public-methods, invalid-name, redefined-builtin
+import asyncio
 import time
 from ..timer import Timer
 
@@ -14,14 +15,32 @@ class Message:
     :param bytes data: The content of the message, from 0 to 8 bytes of data
     :param bool extended: True if the message has an extended identifier,
         False if it has a standard identifier
+    :param int priority: Transmit priority from 0 (lowest) to 3 (highest)
     """
 
+    # No per-instance dict under CPython, MicroPython ignores __slots__
+    __slots__ = (
+        "_data",
+        "_bufs",
+        "id",
+        "extended",
+        "priority",
+        "filter_index",
+        "buffer_index",
+        "timestamp",
+    )
+
     # pylint:disable=too-many-arguments,invalid-name,redefined-builtin
-    def __init__(self, id, data, extended=False):
+    def __init__(self, id, data, extended=False, priority=0):
         self._data = None
+        self._bufs = None
         self.id = id
         self.data = data
         self.extended = extended
+        self.priority = priority
+        self.filter_index = None
+        self.buffer_index = None
+        self.timestamp = None
 
     id: int
     """The numeric ID of the message"""
@@ -29,6 +48,18 @@ class Message:
     extended: bool
     """Indicates whether the the message has an extended identifier"""
 
+    priority: int
+    """Transmit priority from 0 (lowest) to 3 (highest)"""
+
+    filter_index: int
+    """For a received message, the acceptance filter (0-5) that matched it, otherwise None"""
+
+    buffer_index: int
+    """For a received message, the receive buffer (0 or 1) it arrived in, otherwise None"""
+
+    timestamp: int
+    """For a received message, the `time.ticks_us()` value when it was received, otherwise None"""
+
     @property
     def data(self):
         """The content of the message"""
@@ -36,8 +67,7 @@ class Message:
 
     @data.setter
     def data(self, new_data):
-        if (new_data is None) or (not (type(new_data) in [bytes, bytearray])):
-
+        if type(new_data) not in (bytes, bytearray):
             raise AttributeError(
                 "non-RTR canio.Message must have a `data` argument of type `bytes`"
             )
@@ -49,6 +79,24 @@ class Message:
         # self._data = new_data
         self._data = bytearray(new_data)
 
+    def _load(self, id, extended, src, offset, length):
+        """Overwrite the message in place from `length` bytes of `src` starting at `offset`.
+
+        For driver use, there is no validation and after the first call no allocation. Data
+        previously returned by `data` may be overwritten."""
+        bufs = self._bufs
+        if bufs is None:
+            # One buffer per length so that data never needs resizing
+            bufs = self._bufs = [bytearray(n) for n in range(9)]
+
+        data = bufs[length]
+        for idx in range(length):
+            data[idx] = src[offset + idx]
+
+        self.id = id
+        self.extended = extended
+        self._data = data
+
 
 class RemoteTransmissionRequest:
     """A class representing a CANbus remote frame
@@ -57,12 +105,17 @@ class RemoteTransmissionRequest:
     :param length int: The length of the requested message
     :param bool extended: True if the message has an extended identifier,
         False if it has a standard identifier
+    :param int priority: Transmit priority from 0 (lowest) to 3 (highest)
     """
 
-    def __init__(self, id: int, length: int, *, extended: bool = False):
+    def __init__(self, id: int, length: int, *, extended: bool = False, priority: int = 0):
         self.id = id
         self.length = length
         self.extended = extended
+        self.priority = priority
+        self.filter_index = None
+        self.buffer_index = None
+        self.timestamp = None
 
     id: int
     """The numeric ID of the message"""
@@ -73,6 +126,18 @@ class RemoteTransmissionRequest:
     length: int
     """The length of the requested message, from 0 to 8"""
 
+    priority: int
+    """Transmit priority from 0 (lowest) to 3 (highest)"""
+
+    filter_index: int
+    """For a received frame, the acceptance filter (0-5) that matched it, otherwise None"""
+
+    buffer_index: int
+    """For a received frame, the receive buffer (0 or 1) it arrived in, otherwise None"""
+
+    timestamp: int
+    """For a received frame, the `time.ticks_us()` value when it was received, otherwise None"""
+
 
 # Replace the above implementation with core canio implementation if it is available
 try:
@@ -93,6 +158,7 @@ class Listener:
         self._can_bus_obj = can_bus_obj
         self._timeout = None
         self.timeout = timeout
+        self._handlers = [None] * 6
 
     @property
     def timeout(self):
@@ -118,6 +184,60 @@ class Listener:
             return self._can_bus_obj.read_message()
         return None
 
+    def receive_into(self, message):
+        """Receives a message into an existing `Message` without allocating memory. Waits up to\
+        self.timeout seconds and returns None if no message is received, otherwise `message`.\
+        A remote frame is returned as a new RemoteTransmissionRequest instead."""
+        if self._can_bus_obj is None:
+            raise ValueError(
+                "Object has been deinitialized and can no longer be used. Create a new object."
+            )
+        self._timer.rewind_to(self.timeout)
+        while not self._timer.expired:
+            if self._can_bus_obj.unread_message_count == 0:
+                continue
+            return self._can_bus_obj.read_message_into(message)
+        return None
+
+    def drain(self, max_n=None):
+        """Read every frame waiting in the controller in one pass and return up to `max_n`\
+        messages, oldest first, without waiting. Returns an empty list if there are none."""
+        if self._can_bus_obj is None:
+            raise ValueError(
+                "Object has been deinitialized and can no longer be used. Create a new object."
+            )
+        return self._can_bus_obj.read_messages(max_n)
+
+    def drain_into(self, messages):
+        """As ``drain()``, but overwrites the `Message` objects in `messages` without allocating\
+        and returns how many were filled. Remote frames are discarded."""
+        if self._can_bus_obj is None:
+            raise ValueError(
+                "Object has been deinitialized and can no longer be used. Create a new object."
+            )
+        return self._can_bus_obj.read_messages_into(messages)
+
+    def set_handler(self, filter_index, handler):
+        """Register ``handler(message)`` to be called by ``dispatch()`` for messages accepted\
+        by acceptance filter `filter_index` (0-5). A handler of None removes it."""
+        if not 0 <= filter_index < len(self._handlers):
+            raise ValueError("Filter index must be from 0 to %d" % (len(self._handlers) - 1))
+        self._handlers[filter_index] = handler
+
+    def dispatch(self, message):
+        """Call the handler registered for the filter that accepted `message`. Returns True if\
+        a handler was called, False if there is no handler for the filter or `message` was not\
+        received through a filter."""
+        if message.filter_index is None:
+            return False
+
+        handler = self._handlers[message.filter_index]
+        if handler is None:
+            return False
+
+        handler(message)
+        return True
+
     def in_waiting(self):
         """Returns the number of messages waiting"""
         if self._can_bus_obj is None:
@@ -126,6 +246,45 @@ class Listener:
             )
         return self._can_bus_obj.unread_message_count
 
+    async def wait(self):
+        """Wait until a message is available. A following ``receive()`` returns without blocking"""
+        if self._can_bus_obj is None:
+            raise ValueError(
+                "Object has been deinitialized and can no longer be used. Create a new object."
+            )
+        await self._can_bus_obj.wait_for_message()
+
+    async def get(self, timeout_ms=None):
+        """Wait for and return the next message, yielding to other tasks while waiting. Returns\
+        None if no message arrives within `timeout_ms` milliseconds, or waits forever if\
+        `timeout_ms` is None. Cancelling the waiting task does not lose a message."""
+        if self._can_bus_obj is None:
+            raise ValueError(
+                "Object has been deinitialized and can no longer be used. Create a new object."
+            )
+        # Nothing is taken from the queue until the wait has finished
+        if timeout_ms is None:
+            await self._can_bus_obj.wait_for_message()
+        else:
+            try:
+                await asyncio.wait_for_ms(self._can_bus_obj.wait_for_message(), timeout_ms)
+            except asyncio.TimeoutError:
+                return None
+
+        return self._can_bus_obj.read_message()
+
+    def __aiter__(self):
+        """Returns self, for ``async for message in listener``"""
+        if self._can_bus_obj is None:
+            raise ValueError(
+                "Object has been deinitialized and can no longer be used. Create a new object."
+            )
+        return self
+
+    async def __anext__(self):
+        """Waits for and returns the next message"""
+        return await self.get()
+
     def __iter__(self):
         """Returns self"""
         if self._can_bus_obj is None:
@@ -1,3 +1,7 @@
+import asyncio
+from time import ticks_us, ticks_diff
+
+
 class SPIDevice():
     def __init__(self, spi_bus, cs_pin):
         self.spi_bus = spi_bus
@@ -13,3 +17,136 @@ class SPIDevice():
         return False
 
 
+class _CountingSPI:
+    # SPI bus counting bytes written to and read from the device
+    def __init__(self, spi_bus):
+        self.spi_bus = spi_bus
+        self.bytes_out = 0
+        self.bytes_in = 0
+
+    def write(self, buf):
+        self.bytes_out += len(buf)
+        return self.spi_bus.write(buf)
+
+    def read(self, nbytes, write=0x00):
+        self.bytes_in += nbytes
+        return self.spi_bus.read(nbytes, write)
+
+    def readinto(self, buf, write=0x00):
+        self.bytes_in += len(buf)
+        return self.spi_bus.readinto(buf, write)
+
+    def write_readinto(self, write_buf, read_buf):
+        self.bytes_out += len(write_buf)
+        self.bytes_in += len(read_buf)
+        return self.spi_bus.write_readinto(write_buf, read_buf)
+
+
+class ProfilingSPIDevice(SPIDevice):
+    """An SPIDevice counting chip select cycles, bytes out and in, and microseconds with chip
+    select active, against the driver method making the transfer.
+
+    Methods are attributed with `wrap()` and `wrap_async()`. Transfers go to the innermost
+    wrapped method running, or for a coroutine the wrapped method the current task is in,
+    otherwise to "other". See `MCP2515.profile`.
+    """
+
+    def __init__(self, spi_bus, cs_pin):
+        super().__init__(spi_bus, cs_pin)
+        self._counting_bus = _CountingSPI(spi_bus)
+        self._stack = []
+        self._tasks = {}
+        self._start = 0
+        self.stats = {}
+
+    def _entry(self, name):
+        # calls, CS cycles, bytes out, bytes in, us
+        entry = self.stats.get(name)
+        if entry is None:
+            entry = self.stats[name] = [0, 0, 0, 0, 0]
+        return entry
+
+    def _section(self):
+        if self._stack:
+            return self._stack[-1]
+        try:
+            return self._tasks.get(asyncio.current_task(), "other")
+        except RuntimeError:
+            return "other"
+
+    def wrap(self, func, name):
+        """Return func with its SPI traffic counted under name"""
+
+        def profiled(*args, **kwargs):
+            self._entry(name)[0] += 1
+            self._stack.append(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._stack.pop()
+
+        return profiled
+
+    def wrap_async(self, func, name):
+        """Return coroutine function func with its SPI traffic counted under name"""
+
+        async def profiled(*args, **kwargs):
+            self._entry(name)[0] += 1
+            task = asyncio.current_task()
+            outer = self._tasks.get(task)
+            self._tasks[task] = name
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                if outer is None:
+                    del self._tasks[task]
+                else:
+                    self._tasks[task] = outer
+
+        return profiled
+
+    def __enter__(self):
+        self.cs_pin.value(self.cs_active_value)
+        self._start = ticks_us()
+        return self._counting_bus
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cs_pin.value(not self.cs_active_value)
+        elapsed = ticks_diff(ticks_us(), self._start)
+
+        bus = self._counting_bus
+        entry = self._entry(self._section())
+        entry[1] += 1
+        entry[2] += bus.bytes_out
+        entry[3] += bus.bytes_in
+        entry[4] += elapsed
+        bus.bytes_out = 0
+        bus.bytes_in = 0
+        return False
+
+    def reset(self):
+        """Clear the counts"""
+        self.stats = {}
+
+    def report(self):
+        """Print the counts, most SPI time first"""
+        total_us = sum(entry[4] for entry in self.stats.values()) or 1
+        print(
+            "{:<24} {:>7} {:>7} {:>8} {:>8} {:>9} {:>6}".format(
+                "method", "calls", "CS", "out", "in", "us", "time"
+            )
+        )
+        for name, entry in sorted(self.stats.items(), key=lambda item: -item[1][4]):
+            print(
+                "{:<24} {:>7} {:>7} {:>8} {:>8} {:>9} {:>5.1f}%".format(
+                    name, *entry, 100 * entry[4] / total_us
+                )
+            )
+
+    async def report_every(self, period_ms):
+        """Print and clear the counts every `period_ms` milliseconds. Run this as a task, it\
+        never returns."""
+        while True:
+            await asyncio.sleep_ms(period_ms)
+            self.report()
+            self.reset()
@@ -0,0 +1,120 @@
+# SPDX-FileCopyrightText: Copyright (c) 2024 Alan Sparrow
+#
+# SPDX-License-Identifier: MIT
+"""Bit timing for the MCP2515; see `bit_timing` and `decode_timing`
+
+A bit is made of time quanta (TQ) of ``2 * (BRP + 1) / crystal_freq`` each: one synchronisation
+quantum, then the propagation segment and phase segment 1, the sample point, and phase
+segment 2.
+"""
+
+from micropython import const
+
+# Allowed range of each segment in TQ, from the datasheet
+_MIN_TQ = const(5)
+_MAX_TQ = const(25)
+_MAX_SEG = const(8)
+_MAX_BRP = const(64)
+
+# Phase segment 2 is at least the information processing time
+_MIN_PS2 = const(2)
+
+# Largest bit rate error accepted, 1% as the oddest of the fixed table entries
+_MAX_ERROR_PPM = const(10000)
+
+_CNF2_BTLMODE = const(0x80)
+
+
+def default_sample_point(baudrate):
+    """Sample point recommended by CiA 301 for a bit rate, as a fraction of the bit"""
+    if baudrate > 800000:
+        return 0.75
+    if baudrate > 500000:
+        return 0.8
+    return 0.875
+
+
+def bit_timing(crystal_freq, baudrate, sample_point=None, sjw=1):
+    """Calculate CNF1-3 for a bit rate
+
+    :param int crystal_freq: MCP2515 crystal frequency in Hz
+    :param int baudrate: Bit rate in Hz
+    :param float sample_point: Sample point as a fraction of the bit. Defaults to\
+        `default_sample_point()` for the bit rate
+    :param int sjw: Synchronisation jump width in TQ, 1 to 4. Defaults to 1
+    :return: (CNF1, CNF2, CNF3). The settings closest to the bit rate are chosen, then those\
+        closest to the sample point, then the most TQ per bit
+    :raises ValueError: If the bit rate can't be reached within 1%
+    """
+    if sample_point is None:
+        sample_point = default_sample_point(baudrate)
+    if not 0.5 <= sample_point < 1:
+        raise ValueError("Sample point must be from 0.5 to less than 1")
+    if not 1 <= sjw <= 4:
+        raise ValueError("SJW must be from 1 to 4")
+
+    best = None
+    for ntq in range(_MAX_TQ, _MIN_TQ - 1, -1):
+        brp = (crystal_freq + baudrate * ntq) // (2 * baudrate * ntq)
+        if not 1 <= brp <= _MAX_BRP:
+            continue
+
+        actual = crystal_freq // (2 * brp * ntq)
+        error_ppm = abs(actual - baudrate) * 1000000 // baudrate
+        if error_ppm > _MAX_ERROR_PPM:
+            continue
+
+        segments = _split(ntq, sample_point, sjw)
+        if segments is None:
+            continue
+
+        sp_error = abs((ntq - segments[2]) / ntq - sample_point)
+        key = (error_ppm, sp_error)
+        if best is None or key < best[0]:
+            best = (key, brp, segments)
+
+    if best is None:
+        raise ValueError(
+            "Bit rate {} can't be reached with a {} crystal".format(baudrate, crystal_freq)
+        )
+
+    _, brp, (prop_seg, ps1, ps2) = best
+    cnf1 = ((sjw - 1) << 6) | (brp - 1)
+    cnf2 = _CNF2_BTLMODE | ((ps1 - 1) << 3) | (prop_seg - 1)
+    cnf3 = ps2 - 1
+    return cnf1, cnf2, cnf3
+
+
+def _split(ntq, sample_point, sjw):
+    # Share the TQ after the sync quantum between the segments for the sample point
+    ps2 = ntq - int(ntq * sample_point + 0.5)
+    ps2 = min(max(ps2, _MIN_PS2, sjw + 1, ntq - 1 - 2 * _MAX_SEG), _MAX_SEG)
+    tseg1 = ntq - 1 - ps2
+    if tseg1 < ps2 or tseg1 > 2 * _MAX_SEG:
+        return None
+
+    ps1 = max(tseg1 // 2, tseg1 - _MAX_SEG, sjw)
+    prop_seg = tseg1 - ps1
+    if not 1 <= prop_seg <= _MAX_SEG or ps1 > _MAX_SEG:
+        return None
+
+    return prop_seg, ps1, ps2
+
+
+def decode_timing(crystal_freq, cnf1, cnf2, cnf3):
+    """Bit rate and sample point set by CNF1-3
+
+    :param int crystal_freq: MCP2515 crystal frequency in Hz
+    :return: (bit rate in Hz, sample point as a fraction of the bit, TQ per bit)
+    """
+    brp = (cnf1 & 0x3F) + 1
+    prop_seg = (cnf2 & 0x07) + 1
+    ps1 = ((cnf2 >> 3) & 0x07) + 1
+    if cnf2 & _CNF2_BTLMODE:
+        ps2 = (cnf3 & 0x07) + 1
+    else:
+        # Phase segment 2 is the larger of phase segment 1 and the processing time
+        ps2 = max(ps1, _MIN_PS2)
+
+    ntq = 1 + prop_seg + ps1 + ps2
+    return crystal_freq / (2 * brp * ntq), (1 + prop_seg + ps1) / ntq, ntq
@@ -17,6 +17,10 @@
 
 # Message ID is 7 bits command + 4 bits bell number
 
+# Bus bit rate, all nodes must agree. A short tower bus can run at
+# 500000 or 1000000 for shorter frames
+BAUDRATE = 250000
+
 CMD_MASK = 0x7F0
 
 # -----------------
@@ -21,22 +21,76 @@ import time
 
 import machine
 
-from .mcp2515 import MCP2515
+from . import msgid, uartframe
+from .canfilter import command_ids, compile_filters
+from .flashlog import FlashLog
+from .mcp2515 import MCP2515, SendResult
 from .mcp2515.canio import Message
 from .primitives import RingbufQueue
+from .strikes import StrikeScheduler
 
 BELLS = "x1234567890ET"
 
-# Accept all messages
-MASKS = [0x0, 0x0]
-FILTERS = [0x0, 0x0, 0x0, 0x0, 0x0, 0x0]
+# RP2040 pin assignments
+SCK_PIN = 2
+MOSI_PIN = 3
+MISO_PIN = 4
+CAN_CS_PIN = 9
 
+# MCP2515 INT pin, None if not connected and the receiver then polls the
+# controller. With INT wired (GP20 on the simulated tower) frames are
+# timestamped by its interrupt and the receiver sleeps until one
+# arrives. Only set this if the pin is wired, with the pull-up an
+# unconnected INT reads idle and no frame is ever read
+CAN_INT_PIN = None
 
-# Output the bell message at specified time
-async def delay(bell, strike_ticks_ms, log_q):
-    t = time.ticks_diff(strike_ticks_ms, time.ticks_ms())
-    await asyncio.sleep_ms(t)
+# Controller polling period without an INT pin. Frames are timestamped
+# when read, so up to this late, and strike times vary by as much.
+# Polling on every scheduler pass keeps strikes accurate at the cost of
+# a busy CPU
+RX_POLL_MS = 0
 
+# Bus health sampling period
+HEALTH_PERIOD_MS = 200
+
+# Print the driver's SPI profile this often, None to disable
+SPI_PROFILE_MS = None
+
+# Most dings handled per scheduler pass, enough for a round on twelve bells
+RX_BATCH = 12
+
+# Most strikes waiting for their time, two rounds on twelve bells
+STRIKE_SLOTS = 24
+
+# Strike log directory, see util/remote.py
+LOG_DIR = "/log"
+
+# Time without strikes that ends a touch, the next strike starts a new log file
+TOUCH_GAP_MS = 120000
+
+# UART strike log to the Pico W, "bell,ticks_ms" text lines if False,
+# otherwise binary frames with a sequence number and CRC, see uartframe.py
+UART_BINARY = False
+
+# Most strikes waiting for the UART logger, all sent together
+LOG_BATCH = 12
+
+
+# Get list of delays(ms) for each bell
+def read_delays():
+    with open("delays.json") as f:
+        return json.load(f)
+
+
+# Load acceptance filters passing only ding messages for our bells
+def load_bell_filters(can, nbells):
+    ids = command_ids(msgid.BELL, range(1, nbells + 1))
+    masks, filters, _ = compile_filters([ids])
+    can.load_filters(masks, filters)
+
+
+# Output the bell message, called by the strike scheduler at the strike time
+def strike(bell, strike_ticks_ms):
     print(BELLS[bell], end="")
 
 
@@ -44,30 +98,55 @@ async def logger(msg_q):
     # Create UART for PICO W comms
     uart = machine.UART(0, 115200)
     writer = asyncio.StreamWriter(uart)
+    frame = uartframe.frame_buffer(LOG_BATCH)
+    max_records = (len(frame) - uartframe.OVERHEAD) // uartframe.RECORD_SIZE
+    seq = 0
 
     while True:
+        # Wait for a strike then send every strike waiting, draining once
         (bell, t) = await msg_q.get()
 
-        writer.write("{},{}\n".format(bell, t))
+        if UART_BINARY:
+            n = 0
+            while True:
+                uartframe.pack_record(frame, n, bell, t)
+                n += 1
+                if n == max_records or msg_q.empty():
+                    break
+                (bell, t) = msg_q.get_nowait()
+
+            length = uartframe.finish_frame(frame, seq, n)
+            writer.write(memoryview(frame)[:length])
+            seq = (seq + 1) & 0xFF
+        else:
+            while True:
+                writer.write("{},{}\n".format(bell, t))
+                if msg_q.empty():
+                    break
+                (bell, t) = msg_q.get_nowait()
+
         await writer.drain()
 
 
-async def can_receive(can, log_q):
-    # Get list of delays(ms) for each bell
-    with open("delays.json") as f:
-        delays = json.load(f)
-        nbells = len(delays)
+async def can_receive(can, delays, strikes, log_q):
+    nbells = len(delays)
 
-    # Listen for bell messages
+    # Listen for bell messages, taking every waiting ding in one go
     listener = can.listen()
+    rx_msgs = [Message(0, b"") for _ in range(RX_BATCH)]
     while True:
-        if listener.in_waiting():
-            rx_msg = listener.receive()
+        await listener.wait()
+        n = listener.drain_into(rx_msgs)
 
+        for idx in range(n):
+            rx_msg = rx_msgs[idx]
             bell = rx_msg.id
             if bell > 0 and bell <= nbells:
-                strike_ticks_ms = time.ticks_add(time.ticks_ms(), delays[bell - 1])
-                asyncio.create_task(delay(bell, strike_ticks_ms, log_q))
+                # Time the strike from when the ding arrived, not when this task got to it
+                age_ms = time.ticks_diff(time.ticks_us(), rx_msg.timestamp) // 1000
+                strike_ticks_ms = time.ticks_add(time.ticks_ms(), delays[bell - 1] - age_ms)
+                if not strikes.add(bell, strike_ticks_ms):
+                    print("Strike queue full")
 
                 # Send strike info to logger
                 try:
@@ -75,17 +154,14 @@ async def can_receive(can, log_q):
                 except IndexError:
                     pass
 
-        await asyncio.sleep_ms(0)
-
 
 async def can_loopback(can):
     while 1:
         for bell in [1, 2, 3, 4, 5, 6, 1, 2, 3, 4, 5, 6]:
             msg = Message(bell, data=b"")
 
-            try:
-                can.send(msg)
-            except RuntimeError:
+            result = await can.send_async(msg, timeout_ms=50)
+            if result == SendResult.TIMEOUT:
                 print("Can't send ding message")
 
             await asyncio.sleep_ms(300)
@@ -93,27 +169,87 @@ async def can_loopback(can):
         await asyncio.sleep_ms(300)
 
 
+def can_pins():
+    spi = machine.SPI(
+        0,
+        sck=machine.Pin(SCK_PIN),
+        mosi=machine.Pin(MOSI_PIN),
+        miso=machine.Pin(MISO_PIN),
+    )
+    cs = machine.Pin(CAN_CS_PIN, machine.Pin.OUT, value=1)
+
+    if CAN_INT_PIN is None:
+        int_pin = None
+    else:
+        int_pin = machine.Pin(CAN_INT_PIN, machine.Pin.IN, machine.Pin.PULL_UP)
+
+    return spi, cs, int_pin
+
+
 async def main():
     # Create CAN driver
-    spi = machine.SPI(0, sck=machine.Pin(2), mosi=machine.Pin(3), miso=machine.Pin(4))
-    cs = machine.Pin(9, machine.Pin.OUT, value=1)
+    spi, cs, int_pin = can_pins()
 
-    can = MCP2515(spi, cs)
-    can.load_filters(MASKS, FILTERS)
+    can = MCP2515(
+        spi,
+        cs,
+        baudrate=msgid.BAUDRATE,
+        auto_restart=True,
+        int_pin=int_pin,
+        poll_ms=RX_POLL_MS,
+        fast_send=True,
+        rx_queue_size=RX_BATCH,
+    )
 
-    log_q = RingbufQueue(12)
+    delays = read_delays()
+    load_bell_filters(can, len(delays))
 
-    await asyncio.gather(can_receive(can, log_q), logger(log_q))
+    # Strikes are logged to flash as they are output
+    flash_log = FlashLog(LOG_DIR, touch_gap_ms=TOUCH_GAP_MS)
 
+    def log_strike(bell, strike_ticks_ms):
+        strike(bell, strike_ticks_ms)
+        flash_log.add(bell, strike_ticks_ms)
 
-async def test():
-    # Create CAN driver (in loopback mode)
-    spi = machine.SPI(0, sck=machine.Pin(2), mosi=machine.Pin(3), miso=machine.Pin(4))
-    cs = machine.Pin(9, machine.Pin.OUT, value=1)
+    strikes = StrikeScheduler(STRIKE_SLOTS, log_strike)
+    log_q = RingbufQueue(LOG_BATCH + 1)
 
-    can = MCP2515(spi, cs, loopback=True, silent=True)
-    can.load_filters(MASKS, FILTERS)
+    tasks = [
+        can_receive(can, delays, strikes, log_q),
+        strikes.run(),
+        flash_log.run(strikes),
+        logger(log_q),
+    ]
+    if SPI_PROFILE_MS is not None:
+        tasks.append(can.profile().report_every(SPI_PROFILE_MS))
 
-    log_q = RingbufQueue(12)
+    await asyncio.gather(*tasks, can.monitor_health(HEALTH_PERIOD_MS))
 
-    await asyncio.gather(can_loopback(can), can_receive(can, log_q), logger(log_q))
+
+async def test():
+    # Create CAN driver (in loopback mode)
+    spi, cs, int_pin = can_pins()
+
+    can = MCP2515(
+        spi,
+        cs,
+        loopback=True,
+        silent=True,
+        int_pin=int_pin,
+        poll_ms=RX_POLL_MS,
+        fast_send=True,
+        rx_queue_size=RX_BATCH,
+    )
+
+    delays = read_delays()
+    load_bell_filters(can, len(delays))
+
+    strikes = StrikeScheduler(STRIKE_SLOTS, strike)
+    log_q = RingbufQueue(LOG_BATCH + 1)
+
+    await asyncio.gather(
+        can_loopback(can),
+        can_receive(can, delays, strikes, log_q),
+        strikes.run(),
+        logger(log_q),
+    )
@@ -20,14 +20,27 @@ import machine
 import struct
 import time
 
-from .mcp2515 import MCP2515
+from .mcp2515 import MCP2515, SendResult
 from .mcp2515.canio import Message
 from .primitives import RingbufQueue
 from . import msgid
 
-# Accept messages matching b0001xxxxxxx (i.e. ignore messages from other sensors)
-MASKS = [0x780, 0x0]
-FILTERS = [0x80, 0x80, 0x0, 0x0, 0x0, 0x0]
+# Accept receiver commands only, one acceptance filter per command so the
+# filter index identifies the command. BELL_SET fills all of RXF2-5. Fixed
+# rather than compiled at boot, util/filters.py shows canfilter finds no
+# tighter set for these commands
+MASKS = [msgid.CMD_MASK, msgid.CMD_MASK]
+FILTERS = [
+    msgid.ECHO_REQ,
+    msgid.IDENT_REQ,
+    msgid.BELL_SET,
+    msgid.BELL_SET,
+    msgid.BELL_SET,
+    msgid.BELL_SET,
+]
+ECHO_FILTER = 0
+IDENT_FILTER = 1
+BELL_SET_FILTERS = (2, 3, 4, 5)
 
 # RP2040 pin assignments
 SCK_PIN = 2
@@ -37,6 +50,29 @@ CAN_CS_PIN = 9
 LED_PIN = 18
 SENSOR_PIN = 21
 
+# MCP2515 INT pin, set to None if not connected (sensor then polls the controller)
+CAN_INT_PIN = None
+
+# Controller polling period without an INT pin, while waiting for commands
+# and for dings and ACKs to leave. The ding itself is sent at once
+CAN_POLL_MS = 1
+
+# Maximum time to wait for a free CAN transmit buffer
+SEND_TIMEOUT_MS = 50
+
+# A ding not on the bus by now is too late to be useful and is aborted
+DING_DEADLINE_MS = 20
+
+# Bus health sampling period
+HEALTH_PERIOD_MS = 200
+
+# Print the driver's SPI profile this often, None to disable
+SPI_PROFILE_MS = None
+
+# Transmit priorities, a ding leaves the controller before any queued ACK
+DING_PRIORITY = 3
+ACK_PRIORITY = 0
+
 
 async def can_task(msg_q, bell, board_id):
     # Ident state
@@ -51,64 +87,103 @@ async def can_task(msg_q, bell, board_id):
     )
     cs = machine.Pin(CAN_CS_PIN, machine.Pin.OUT, value=1)
 
-    can = MCP2515(spi, cs)
+    if CAN_INT_PIN is None:
+        int_pin = None
+    else:
+        int_pin = machine.Pin(CAN_INT_PIN, machine.Pin.IN, machine.Pin.PULL_UP)
+
+    can = MCP2515(
+        spi,
+        cs,
+        baudrate=msgid.BAUDRATE,
+        auto_restart=True,
+        int_pin=int_pin,
+        poll_ms=CAN_POLL_MS,
+        fast_send=True,
+    )
     can.load_filters(MASKS, FILTERS)
 
-    # Message loop
-    listener = can.listen()
-    while True:
-        # Check for outgoing requests
-        if not msg_q.empty():
-            # Ding message is two bytes delay
+    # Messages are reused, only the bell number and ding delay change
+    ding_msg = Message(msgid.BELL + bell, bytearray(2), priority=DING_PRIORITY)
+    ack_msg = Message(msgid.ACK + bell, board_id, priority=ACK_PRIORITY)
+
+    def ack():
+        ack_msg.id = msgid.ACK + bell
+        return ack_msg
+
+    # Outgoing requests
+    async def tx_loop():
+        nonlocal ident_state
+
+        while True:
             delay = await msg_q.get()
-            data = struct.pack("<H", min(delay, 65535))
 
             if ident_state:
-                msg = Message(id=msgid.ACK + bell, data=board_id)
                 ident_state = False
+                kind = "ident ACK"
+                result = await can.send_async(ack(), timeout_ms=SEND_TIMEOUT_MS)
             else:
-                msg = Message(id=msgid.BELL + bell, data=data)
-
+                # Ding message is two bytes delay
+                kind = "ding"
+                ding_msg.id = msgid.BELL + bell
+                struct.pack_into("<H", ding_msg.data, 0, min(delay, 65535))
+                result = await can.send_async(ding_msg, deadline_ms=DING_DEADLINE_MS)
+
+            if result == SendResult.TIMEOUT:
+                print("Can't send {} message".format(kind))
+            elif result == SendResult.ABORTED:
+                print("Stale {} message dropped".format(kind))
+            elif result != SendResult.QUEUED and result != SendResult.SENT:
+                print("Failed to send {} message, send result {}".format(kind, result))
+
+    # Incoming message handlers, selected by acceptance filter
+    def echo(rx_msg):
+        if rx_msg.id & ~msgid.CMD_MASK == bell:
             try:
-                can.send(msg)
+                can.send(ack())
             except RuntimeError:
-                print("Can't send ding message")
-
-        # Process incoming messages
-        if listener.in_waiting():
-            rx_msg = listener.receive()
-
-            # Echo
-            if rx_msg.id & msgid.CMD_MASK == msgid.ECHO_REQ:
-                if rx_msg.id & ~msgid.CMD_MASK == bell:
-                    msg = Message(id=msgid.ACK + bell, data=board_id)
-                    try:
-                        can.send(msg)
-                    except RuntimeError:
-                        print("Can't send echo ACK message")
-
-            # Ident request
-            elif rx_msg.id & msgid.CMD_MASK == msgid.IDENT_REQ:
-                ident_state = True
-
-            # Bell set
-            elif rx_msg.id & msgid.CMD_MASK == msgid.BELL_SET:
-                if rx_msg.data == board_id:
-                    # Set bell number and store it
-                    bell = rx_msg.id & ~msgid.CMD_MASK
-                    with open("_bell.txt", "w") as f:
-                        f.write(f"{bell}\n")
-
-                    msg = Message(id=msgid.ACK + bell, data=board_id)
-                    try:
-                        can.send(msg)
-                    except RuntimeError:
-                        print("Can't send set ACK message")
+                print("Can't send echo ACK message")
 
-            else:
+    def ident(rx_msg):
+        nonlocal ident_state
+        ident_state = True
+
+    def bell_set(rx_msg):
+        nonlocal bell
+
+        if rx_msg.data == board_id:
+            # Set bell number and store it
+            bell = rx_msg.id & ~msgid.CMD_MASK
+            with open("_bell.txt", "w") as f:
+                f.write(f"{bell}\n")
+
+            try:
+                can.send(ack())
+            except RuntimeError:
+                print("Can't send set ACK message")
+
+    # Incoming messages
+    async def rx_loop():
+        listener = can.listen()
+        listener.set_handler(ECHO_FILTER, echo)
+        listener.set_handler(IDENT_FILTER, ident)
+        for filter_index in BELL_SET_FILTERS:
+            listener.set_handler(filter_index, bell_set)
+
+        rx_msg = Message(0, b"")
+        while True:
+            await listener.wait()
+            if listener.receive_into(rx_msg) is not rx_msg:
+                continue
+
+            if not listener.dispatch(rx_msg):
                 print(f"Unknown message: {rx_msg.id}")
 
-        await asyncio.sleep_ms(0)
+    tasks = [tx_loop(), rx_loop()]
+    if SPI_PROFILE_MS is not None:
+        tasks.append(can.profile().report_every(SPI_PROFILE_MS))
+
+    await asyncio.gather(*tasks, can.monitor_health(HEALTH_PERIOD_MS))
 
 
 # Send message after specified delay
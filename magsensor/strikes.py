@@ -0,0 +1,111 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Strike scheduler
+#
+# Strikes due at a time wait in a ring of preallocated slots, kept in
+# time order by insertion. One task emits them: it sleeps on a flag set
+# by a one-shot timer armed for the earliest strike, and the timer is
+# re-armed whenever the earliest strike changes. Nothing is allocated per
+# strike, and strikes due in the same ms come out in the order they were
+# added.
+
+import asyncio
+import time
+
+import machine
+
+
+class StrikeScheduler:
+    # size: most strikes waiting at once
+    # on_strike: called with (bell, strike_ticks_ms) as each strike falls due
+    def __init__(self, size, on_strike):
+        self._times = [0] * size
+        self._bells = bytearray(size)
+        self._head = 0
+        self._count = 0
+        self._on_strike = on_strike
+
+        self._flag = asyncio.ThreadSafeFlag()
+        self._timer = machine.Timer()
+        self._wake_cb = self._wake
+        self.dropped = 0
+
+    def __len__(self):
+        return self._count
+
+    # ms until the earliest strike is due, None if none are waiting
+    def due_in_ms(self):
+        if not self._count:
+            return None
+        return time.ticks_diff(self._times[self._head], time.ticks_ms())
+
+    def _wake(self, _timer):
+        self._flag.set()
+
+    def _arm(self):
+        # Wake the task when the earliest strike is due
+        wait = time.ticks_diff(self._times[self._head], time.ticks_ms())
+        if wait <= 0:
+            self._timer.deinit()
+            self._flag.set()
+        else:
+            self._timer.init(mode=machine.Timer.ONE_SHOT, period=wait, callback=self._wake_cb)
+
+    # Add a strike. Returns False, and counts it in dropped, if every slot is taken
+    def add(self, bell, strike_ticks_ms):
+        size = len(self._bells)
+        if self._count == size:
+            self.dropped += 1
+            return False
+
+        # Move later strikes up a slot, from the tail back
+        pos = self._count
+        while pos > 0:
+            prev = (self._head + pos - 1) % size
+            if time.ticks_diff(self._times[prev], strike_ticks_ms) <= 0:
+                break
+            idx = (self._head + pos) % size
+            self._times[idx] = self._times[prev]
+            self._bells[idx] = self._bells[prev]
+            pos -= 1
+
+        idx = (self._head + pos) % size
+        self._times[idx] = strike_ticks_ms
+        self._bells[idx] = bell
+        self._count += 1
+
+        if pos == 0:
+            self._arm()
+        return True
+
+    # Emit strikes as they fall due. Run as a task, never returns
+    async def run(self):
+        size = len(self._bells)
+        while True:
+            await self._flag.wait()
+
+            while self._count:
+                head = self._head
+                strike_ticks_ms = self._times[head]
+                if time.ticks_diff(strike_ticks_ms, time.ticks_ms()) > 0:
+                    self._arm()
+                    break
+
+                self._head = (head + 1) % size
+                self._count -= 1
+                self._on_strike(self._bells[head], strike_ticks_ms)
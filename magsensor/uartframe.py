@@ -0,0 +1,129 @@
+# CANBell - Bell sensor
+#
+# Copyright (C) 2024  Alan Sparrow
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Binary framing for the receiver's UART strike log
+#
+# A frame is
+#
+#   SYNC  LEN  SEQ  records  CRC
+#
+# SYNC is 0xA5, LEN the length of the records in bytes and SEQ a sequence
+# number counting frames modulo 256. Each record is 4 bytes little endian
+# as in the flash log: the bell number in the top byte and the low 24 bits
+# of the strike's ticks_ms. CRC is CRC-16/CCITT-FALSE over LEN, SEQ and
+# the records, sent little endian. A receiver finds a gap in SEQ where
+# frames were lost and resynchronises on the next SYNC after a bad CRC.
+#
+# Shared by the receiver, the Pico W and util/uartlog.py on a PC.
+
+import struct
+
+SYNC = 0xA5
+RECORD_SIZE = 4
+HEADER_SIZE = 3
+OVERHEAD = HEADER_SIZE + 2
+MAX_RECORDS = 255 // RECORD_SIZE
+TIME_MASK = 0xFFFFFF
+
+
+def crc16(data, start=0, end=None, crc=0xFFFF):
+    if end is None:
+        end = len(data)
+    for idx in range(start, end):
+        crc ^= data[idx] << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+    return crc
+
+
+# Buffer for a frame of up to n records
+def frame_buffer(n):
+    return bytearray(OVERHEAD + RECORD_SIZE * min(n, MAX_RECORDS))
+
+
+# Fill buf with a frame of the n records already packed after the header with
+# pack_record(). Returns the frame length
+def finish_frame(buf, seq, n):
+    length = RECORD_SIZE * n
+    buf[0] = SYNC
+    buf[1] = length
+    buf[2] = seq & 0xFF
+    end = HEADER_SIZE + length
+    struct.pack_into("<H", buf, end, crc16(buf, 1, end))
+    return end + 2
+
+
+def pack_record(buf, idx, bell, strike_ticks_ms):
+    struct.pack_into(
+        "<I", buf, HEADER_SIZE + RECORD_SIZE * idx, (bell << 24) | (strike_ticks_ms & TIME_MASK)
+    )
+
+
+class FrameDecoder:
+    # Counts of frames missing from the sequence and of corrupt stretches, each
+    # from a bad frame to the next good one
+    def __init__(self):
+        self._buf = bytearray()
+        self._seq = None
+        self._resync = False
+        self.lost = 0
+        self.corrupt = 0
+
+    # Add received bytes, returns a list of (bell, strike time) from the frames completed
+    def feed(self, data):
+        buf = self._buf + data
+        strikes = []
+        pos = 0
+
+        while True:
+            while pos < len(buf) and buf[pos] != SYNC:
+                pos += 1
+
+            if len(buf) - pos < 2:
+                break
+            length = buf[pos + 1]
+            end = pos + HEADER_SIZE + length
+            valid = not length % RECORD_SIZE and length <= RECORD_SIZE * MAX_RECORDS
+            if valid and len(buf) < end + 2:
+                break
+
+            if not valid or struct.unpack_from("<H", buf, end)[0] != crc16(buf, pos + 1, end):
+                # Not a frame after all, look for the next SYNC. Count the corruption once
+                # however many stray SYNC bytes it takes to get back in step
+                if not self._resync:
+                    self.corrupt += 1
+                    self._resync = True
+                pos += 1
+                continue
+
+            self._resync = False
+
+            seq = buf[pos + 2]
+            if self._seq is not None:
+                self.lost += (seq - self._seq) & 0xFF
+            self._seq = (seq + 1) & 0xFF
+
+            for offset in range(pos + HEADER_SIZE, end, RECORD_SIZE):
+                record = struct.unpack_from("<I", buf, offset)[0]
+                strikes.append((record >> 24, record & TIME_MASK))
+            pos = end + 2
+
+        self._buf = buf[pos:]
+        return strikes
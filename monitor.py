@@ -1,3 +1,4 @@
+import asyncio
 import struct
 from machine import SPI, Pin
 
@@ -9,36 +10,43 @@ from magsensor import msgid
 MASKS = [0x0, 0x0]
 FILTERS = [0x0, 0x0, 0x0, 0x0, 0x0, 0x0]
 
+# Time to wait for each sensor to reply to an ECHO request
+ECHO_TIMEOUT_MS = 10
 
-def can_task():
+# Controller polling period, there is no INT pin
+RX_POLL_MS = 5
+
+
+def show(rx_msg):
+    if rx_msg.id & msgid.CMD_MASK == msgid.ACK:
+        print(f"ACK: bell {rx_msg.id & ~msgid.CMD_MASK}, {bytes(rx_msg.data)}")
+
+    elif rx_msg.id < 16:
+        delay = struct.unpack("<H", rx_msg.data)[0]
+        print(f"DING: bell {rx_msg.id}, delay {delay}")
+
+
+async def can_task():
     spi = SPI(0, sck=Pin(2), mosi=Pin(3), miso=Pin(4))
     cs = Pin(9, Pin.OUT, value=1)
 
-    can = MCP2515(spi, cs)
+    can = MCP2515(spi, cs, baudrate=msgid.BAUDRATE, poll_ms=RX_POLL_MS)
     can.load_filters(MASKS, FILTERS)
 
-    listener = can.listen(timeout=10)
+    listener = can.listen()
 
     # ECHO requests
     for bell in range(1, 16):
         msg = Message(msgid.ECHO_REQ + bell, b"")
         can.send(msg)
 
-        rx_msg = listener.receive()
-        if rx_msg:
-            if rx_msg.id & msgid.CMD_MASK == msgid.ACK:
-                print(f"ACK: bell {rx_msg.id & ~msgid.CMD_MASK}, {bytes(rx_msg.data)}")
-
-    while True:
-        rx_msg = listener.receive()
+        rx_msg = await listener.get(ECHO_TIMEOUT_MS)
         if rx_msg:
-            if rx_msg.id & msgid.CMD_MASK == msgid.ACK:
-                print(f"ACK: bell {rx_msg.id & ~msgid.CMD_MASK}, {bytes(rx_msg.data)}")
+            show(rx_msg)
 
-            elif rx_msg.id < 16:
-                delay = struct.unpack("<H", rx_msg.data)[0]
-                print(f"DING: bell {rx_msg.id}, delay {delay}")
+    async for rx_msg in listener:
+        show(rx_msg)
 
 
 if __name__ == "__main__":
-    can_task()
+    asyncio.run(can_task())
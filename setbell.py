@@ -1,3 +1,4 @@
+import asyncio
 from machine import SPI, Pin
 import time
 
@@ -8,32 +9,28 @@ from magsensor import msgid
 CHECK_TIMEOUT = 5000
 SET_TIMEOUT = 10000
 
+# Controller polling period, there is no INT pin
+RX_POLL_MS = 5
+
 # Accept all messages
 MASKS = [0x0, 0x0]
 FILTERS = [0x0, 0x0, 0x0, 0x0, 0x0, 0x0]
 
 
-def setbell(bell):
-    if bell < 1 or bell > 15:
-        print("Bell number must be between 1 and 15")
-        return
-
+async def setbell_task(bell):
     spi = SPI(0, sck=Pin(2), mosi=Pin(3), miso=Pin(4))
     cs = Pin(9, Pin.OUT, value=1)
 
-    can = MCP2515(spi, cs)
+    can = MCP2515(spi, cs, baudrate=msgid.BAUDRATE, poll_ms=RX_POLL_MS)
     can.load_filters(MASKS, FILTERS)
 
     listener = can.listen()
 
     print("Checking bells are stationary, please wait...")
-    start = time.ticks_ms()
-    while time.ticks_diff(time.ticks_ms(), start) < CHECK_TIMEOUT:
-        if listener.in_waiting():
-            msg = listener.receive()
-            print("ERROR - Detected bell movement.")
-            print("Please make sure none of the bells are swinging and try again")
-            return
+    if await listener.get(CHECK_TIMEOUT):
+        print("ERROR - Detected bell movement.")
+        print("Please make sure none of the bells are swinging and try again")
+        return
 
     print("...OK.")
 
@@ -41,20 +38,25 @@ def setbell(bell):
     print("Now swing bell", bell)
 
     start = time.ticks_ms()
-    timeout = 0
-    while timeout <= SET_TIMEOUT:
-        if listener.in_waiting():
-            msg = listener.receive()
-            if msg.id & msgid.CMD_MASK == msgid.ACK:
-                print(
-                    f"Bell {msg.id & ~msgid.CMD_MASK} detected, reassigning to {bell}"
-                )
-
-                msg.id = msgid.BELL_SET + bell
-                can.send(msg)
-                return
-
-        timeout = time.ticks_diff(time.ticks_ms(), start)
-
-    if timeout > SET_TIMEOUT:
-        print("ERROR - No bell movement detected, please try again")
+    while True:
+        remaining = SET_TIMEOUT - time.ticks_diff(time.ticks_ms(), start)
+        msg = await listener.get(max(remaining, 0))
+        if msg is None:
+            break
+
+        if msg.id & msgid.CMD_MASK == msgid.ACK:
+            print(f"Bell {msg.id & ~msgid.CMD_MASK} detected, reassigning to {bell}")
+
+            msg.id = msgid.BELL_SET + bell
+            can.send(msg)
+            return
+
+    print("ERROR - No bell movement detected, please try again")
+
+
+def setbell(bell):
+    if bell < 1 or bell > 15:
+        print("Bell number must be between 1 and 15")
+        return
+
+    asyncio.run(setbell_task(bell))
@@ -0,0 +1,50 @@
+# Check the bit timing calculator against the driver's fixed settings.
+# For each crystal and rate, prints the bit rate and sample point of the
+# fixed CNF1-3 and of the calculated ones. A failure is a rate the fixed
+# settings reach within 1% and the calculator misses or gets further
+# from. Fixed settings not within 1% of their rate are marked. Runs on
+# the host:
+#
+#   PYTHONPATH=. python util/bittiming.py
+
+import host
+
+host.install()
+
+from magsensor.mcp2515 import _BAUD_RATES
+from magsensor.mcp2515.timing import bit_timing, decode_timing
+
+
+def describe(crystal_freq, cnf):
+    rate, sample_point, ntq = decode_timing(crystal_freq, *cnf)
+    return "{:02x} {:02x} {:02x} {:>9.0f} {:6.1%} {:2}".format(*cnf, rate, sample_point, ntq)
+
+
+if __name__ == "__main__":
+    failures = 0
+    for crystal_freq, rates in _BAUD_RATES.items():
+        print("{} MHz crystal".format(crystal_freq // 1000000))
+        print("  {:>8}  {:<30}  {}".format("rate", "fixed", "calculated"))
+        for baudrate, cnf in sorted(rates.items()):
+            fixed_rate = decode_timing(crystal_freq, *cnf)[0]
+            fixed_ok = abs(fixed_rate - baudrate) <= baudrate / 100
+            note = "" if fixed_ok else "  fixed is off"
+            try:
+                calc = bit_timing(crystal_freq, baudrate)
+            except ValueError:
+                failures += fixed_ok
+                print("  {:>8}  {}  {:<30}{}".format(baudrate, describe(crystal_freq, cnf), "-", note))
+                continue
+
+            # The calculated rate should be no further from the target than the fixed one
+            calc_rate = decode_timing(crystal_freq, *calc)[0]
+            if fixed_ok and abs(calc_rate - baudrate) > abs(fixed_rate - baudrate) + 0.5:
+                failures += 1
+                note = "  WORSE"
+            print(
+                "  {:>8}  {}  {}{}".format(
+                    baudrate, describe(crystal_freq, cnf), describe(crystal_freq, calc), note
+                )
+            )
+
+    print("{} failures".format(failures))
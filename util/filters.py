@@ -0,0 +1,38 @@
+# Print acceptance filters compiled for the sensor and receiver, with the
+# number of IDs each passes. Runs on the host:
+#
+#   PYTHONPATH=. python util/filters.py
+
+from magsensor import msgid
+from magsensor.canfilter import command_ids, compile_filters, verify
+
+
+def report(name, classes):
+    masks, filters, filter_class = compile_filters(classes)
+    result = verify(masks, filters, filter_class, classes)
+
+    print(name)
+    print("  masks   " + " ".join("{:03x}".format(m) for m in masks))
+    print("  filters " + " ".join("{:03x}".format(f) for f in filters))
+    print("  classes " + " ".join("{:3}".format(c) for c in filter_class))
+    print(
+        "  accepted {accepted}, rejected {rejected}, misrouted {misrouted}, "
+        "false accepts {false_accepts} ({false_accept_rate:.2%})".format(**result)
+    )
+
+
+if __name__ == "__main__":
+    report(
+        "Sensor (ECHO_REQ, IDENT_REQ, BELL_SET)",
+        [
+            command_ids(msgid.ECHO_REQ),
+            command_ids(msgid.IDENT_REQ),
+            command_ids(msgid.BELL_SET),
+        ],
+    )
+
+    for nbells in (6, 8, 10, 12):
+        report(
+            "Receiver, {} bells".format(nbells),
+            [command_ids(msgid.BELL, range(1, nbells + 1))],
+        )
@@ -1,9 +1,31 @@
 import os
 import struct
 
+# Touch index written by magsensor/flashlog.py: file number, start,
+# duration (ms), strike count and a mask of the bells rung
+INDEX_FORMAT = "<HIIHH"
+INDEX_SIZE = struct.calcsize(INDEX_FORMAT)
+
+
+def show(n, duration_ms, extra=""):
+    m, s = divmod(min(duration_ms // 1000, 3599), 60)
+    print("Touch {: <2} - {: 2}:{:02}{}".format(n, m, s, extra))
+
+
+def get_index():
+    with open("/log/index", "rb") as f:
+        data = f.read()
+
+    for n in range(len(data) // INDEX_SIZE):
+        number, start, duration, strikes, bells = struct.unpack_from(
+            INDEX_FORMAT, data, n * INDEX_SIZE
+        )
+        nbells = sum(1 for bell in range(16) if bells & (1 << bell))
+        show(n + 1, duration, ", {} strikes on {} bells".format(strikes, nbells))
+
 
 def get_logs():
-    logs = os.listdir("/log")
+    logs = [log for log in os.listdir("/log") if log != "index"]
     logs.sort()
 
     for n, log in enumerate(logs, start=1):
@@ -15,10 +37,12 @@ def get_logs():
             # Remove bell number
             buf[3] = 0
 
-            tim = struct.unpack("<I", buf)[0] // 1000
-            m, s = divmod(min(tim, 3599), 60)
-            print("Touch {: <2} - {: 2}:{:02}".format(n, m, s))
+            show(n, struct.unpack("<I", buf)[0])
 
 
 if __name__ == "__main__":
-    get_logs()
+    # Logs from before the index was kept need every file read
+    try:
+        get_index()
+    except OSError:
+        get_logs()
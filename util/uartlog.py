@@ -0,0 +1,41 @@
+# Decode the receiver's binary UART strike log (receive.UART_BINARY) and
+# print a "bell,time" line per strike, time being the low 24 bits of the
+# receiver's ticks_ms. Lost and corrupt frames are reported as they are
+# found. Reads a capture file, or a serial port already set to 115200
+# baud, on the host:
+#
+#   stty -F /dev/ttyUSB0 115200 raw
+#   PYTHONPATH=. python util/uartlog.py /dev/ttyUSB0
+
+import sys
+
+from magsensor.uartframe import FrameDecoder
+
+
+def decode(f):
+    decoder = FrameDecoder()
+    lost, corrupt = 0, 0
+
+    while True:
+        data = f.read1(256) if hasattr(f, "read1") else f.read(256)
+        if not data:
+            break
+
+        for bell, t in decoder.feed(data):
+            print("{},{}".format(bell, t))
+
+        if decoder.lost != lost or decoder.corrupt != corrupt:
+            print(
+                "# {} frames lost, {} corrupt".format(decoder.lost, decoder.corrupt),
+                file=sys.stderr,
+            )
+            lost, corrupt = decoder.lost, decoder.corrupt
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        with open(sys.argv[1], "rb", buffering=0) as f:
+            decode(f)
+    else:
+        decode(sys.stdin.buffer)